@@ -0,0 +1,80 @@
+import threading
+import logging
+import numpy as np
+
+
+def pcm_to_float32(audio_samples):
+    # int16 PCM at 16 kHz mono -> float32 in [-1, 1], the format whisper expects
+    audio = audio_samples.astype(np.float32)
+    audio *= 1 / 32768.0
+    return audio
+
+
+class AudioBuffer:
+    def __init__(self, sample_rate=16000, max_duration=300.0, initial_duration=30.0, preallocate=False):
+        # Capacity is counted in int16 samples.
+        # preallocate reserves max_duration up front, so append never allocates, e.g. inside the audio callback.
+        # The OS only backs the pages once they are written.
+        self.sample_rate = sample_rate
+        self.max_samples = int(max_duration * sample_rate)
+        if preallocate:
+            self.initial_samples = self.max_samples
+        else:
+            self.initial_samples = min(int(initial_duration * sample_rate), self.max_samples)
+
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # A fresh array, so views handed out for the previous recording stay intact
+        with self.lock:
+            self.samples = np.empty(self.initial_samples, dtype=np.int16)
+            self.length = 0
+            self.overflow_logged = False
+
+    def append(self, data):
+        incoming = np.frombuffer(data, dtype=np.int16)
+        with self.lock:
+            required = self.length + len(incoming)
+            if required > len(self.samples):
+                self.grow(required)
+
+            # Anything past the maximum duration is dropped
+            free = len(self.samples) - self.length
+            if len(incoming) > free:
+                incoming = incoming[:free]
+                if not self.overflow_logged:
+                    logging.warning("Maximum recording duration of %.0fs reached, dropping audio.",
+                                    self.max_samples / self.sample_rate)
+                    self.overflow_logged = True
+
+            self.samples[self.length:self.length + len(incoming)] = incoming
+            self.length += len(incoming)
+
+    def grow(self, required):
+        # Double the capacity, up to the configured maximum
+        capacity = len(self.samples)
+        while capacity < required and capacity < self.max_samples:
+            capacity = min(max(capacity * 2, 1), self.max_samples)
+        if capacity == len(self.samples):
+            return
+
+        samples = np.empty(capacity, dtype=np.int16)
+        samples[:self.length] = self.samples[:self.length]
+        self.samples = samples
+
+    def view(self, start_sample=0):
+        # Zero-copy int16 view of the captured samples
+        with self.lock:
+            return self.samples[start_sample:self.length]
+
+    def as_bytes(self, start_sample=0):
+        # Zero-copy bytes-like view, e.g. for wave.writeframes
+        return memoryview(self.view(start_sample)).cast('B')
+
+    @property
+    def duration(self):
+        return self.length / self.sample_rate
+
+    def __len__(self):
+        return self.length
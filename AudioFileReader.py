@@ -0,0 +1,157 @@
+import struct
+import mmap
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# WAVE format tags
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class AudioFileReader:
+    # Raw .pcm/.raw files carry no header, they are read as this format
+    raw_extensions = ('.pcm', '.raw')
+
+    def __init__(self, path, raw_sample_rate=SAMPLE_RATE, raw_channels=1):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            # The OS pages the file in as windows are read, nothing is loaded up front
+            self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if path.lower().endswith(self.raw_extensions):
+                self.sample_rate, self.channels, dtype = raw_sample_rate, raw_channels, np.dtype('<i2')
+                data_offset, data_size = 0, len(self.mapping)
+            else:
+                self.sample_rate, self.channels, dtype, data_offset, data_size = self.parse_wav_header()
+        except Exception:
+            self.close()
+            raise
+
+        frame_count = data_size // (dtype.itemsize * self.channels)
+        self.samples = np.frombuffer(self.mapping, dtype=dtype, count=frame_count * self.channels,
+                                     offset=data_offset).reshape(frame_count, self.channels)
+
+    @classmethod
+    def supports(cls, path):
+        return isinstance(path, str) and path.lower().endswith(('.wav',) + cls.raw_extensions)
+
+    def parse_wav_header(self):
+        if self.mapping[0:4] != b'RIFF' or self.mapping[8:12] != b'WAVE':
+            raise ValueError(f"{self.path} is not a WAV file")
+
+        position = 12
+        audio_format = None
+        while position + 8 <= len(self.mapping):
+            chunk_id = self.mapping[position:position + 4]
+            chunk_size = struct.unpack('<I', self.mapping[position + 4:position + 8])[0]
+            body = position + 8
+            if chunk_id == b'fmt ':
+                audio_format, channels, sample_rate = struct.unpack('<HHI', self.mapping[body:body + 8])
+                bits_per_sample = struct.unpack('<H', self.mapping[body + 14:body + 16])[0]
+                if audio_format == WAVE_FORMAT_EXTENSIBLE:
+                    audio_format = struct.unpack('<H', self.mapping[body + 24:body + 26])[0]
+            elif chunk_id == b'data':
+                if audio_format is None:
+                    raise ValueError(f"{self.path} has no fmt chunk before its data")
+                # Streamed WAVs may leave the size unset, read to the end of the file then
+                data_size = min(chunk_size, len(self.mapping) - body)
+                return sample_rate, channels, self.get_dtype(audio_format, bits_per_sample), body, data_size
+            # Chunks are padded to an even size
+            position = body + chunk_size + (chunk_size & 1)
+        raise ValueError(f"{self.path} has no data chunk")
+
+    def get_dtype(self, audio_format, bits_per_sample):
+        if audio_format == WAVE_FORMAT_PCM and bits_per_sample in (8, 16, 32):
+            return np.dtype({8: 'u1', 16: '<i2', 32: '<i4'}[bits_per_sample])
+        if audio_format == WAVE_FORMAT_IEEE_FLOAT and bits_per_sample in (32, 64):
+            return np.dtype({32: '<f4', 64: '<f8'}[bits_per_sample])
+        raise ValueError(f"Unsupported WAV format {audio_format} with {bits_per_sample} bits in {self.path}")
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+
+    def read(self, start_seconds=0.0, end_seconds=None):
+        # float32 mono at 16 kHz, only the requested span is converted
+        start = int(start_seconds * self.sample_rate)
+        end = len(self.samples) if end_seconds is None else min(int(end_seconds * self.sample_rate), len(self.samples))
+        return self.to_float32(self.samples[start:end])
+
+    def read_all(self):
+        return self.read()
+
+    def windows(self, window_seconds=30.0, overlap_seconds=2.0):
+        # Yields (start_seconds, audio) for fixed windows that overlap by overlap_seconds
+        if not 0 <= overlap_seconds < window_seconds:
+            raise ValueError(f"Overlap must be at least 0 and shorter than the window, got {overlap_seconds}s "
+                             f"for {window_seconds}s windows")
+        step = window_seconds - overlap_seconds
+        start_seconds = 0.0
+        while start_seconds < self.duration:
+            yield start_seconds, self.read(start_seconds, start_seconds + window_seconds)
+            if start_seconds + window_seconds >= self.duration:
+                break
+            start_seconds += step
+
+    def to_float32(self, samples):
+        kind = samples.dtype.kind
+        audio = samples.astype(np.float32)
+        if kind == 'u':
+            audio -= 128.0
+            audio /= 128.0
+        elif kind == 'i':
+            audio /= float(2 ** (8 * samples.dtype.itemsize - 1))
+
+        if self.channels > 1:
+            audio = audio.mean(axis=1)
+        else:
+            audio = audio[:, 0]
+
+        if self.sample_rate != SAMPLE_RATE and len(audio):
+            target_count = int(len(audio) * SAMPLE_RATE / self.sample_rate)
+            target_times = np.arange(target_count) / SAMPLE_RATE
+            audio = np.interp(target_times, np.arange(len(audio)) / self.sample_rate, audio).astype(np.float32)
+        return np.ascontiguousarray(audio)
+
+    def close(self):
+        self.samples = None
+        if getattr(self, 'mapping', None) is not None:
+            try:
+                self.mapping.close()
+            except BufferError:
+                # A caller still holds a view, the mapping is released with it
+                pass
+            self.mapping = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def transcribe_windows(transcribe, reader, window_seconds=30.0, overlap_seconds=2.0):
+    # Decode window by window and stitch the segments back onto the file's timeline.
+    # Each window owns the time from the middle of its leading overlap to the middle of its trailing one.
+    segments = []
+    language = None
+    half_overlap = overlap_seconds / 2
+    for start_seconds, audio in reader.windows(window_seconds, overlap_seconds):
+        result = transcribe(audio)
+        language = language or result.get("language")
+
+        owned_start = start_seconds + half_overlap if start_seconds > 0 else 0.0
+        owned_end = start_seconds + window_seconds - half_overlap
+        if start_seconds + window_seconds >= reader.duration:
+            owned_end = float('inf')
+
+        for segment in result.get("segments", []):
+            start = segment["start"] + start_seconds
+            end = segment["end"] + start_seconds
+            if owned_start <= (start + end) / 2 < owned_end:
+                segments.append({"start": start, "end": end, "text": segment["text"]})
+
+    return {"text": "".join(segment["text"] for segment in segments), "segments": segments, "language": language}
@@ -0,0 +1,105 @@
+import threading
+import logging
+import sys
+import os
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Unix nice values and Windows priority classes per priority setting
+PRIORITIES = {
+    "idle": (19, "IDLE_PRIORITY_CLASS"),
+    "below_normal": (10, "BELOW_NORMAL_PRIORITY_CLASS"),
+    "normal": (0, "NORMAL_PRIORITY_CLASS"),
+    "above_normal": (-5, "ABOVE_NORMAL_PRIORITY_CLASS"),
+    "high": (-10, "HIGH_PRIORITY_CLASS"),
+}
+
+# Settings left at these values are not touched
+DEFAULT_TUNING = {"intra_op_threads": 0, "inter_op_threads": 0, "priority": None, "affinity": []}
+
+
+def apply_cpu_tuning(settings, current_thread=False):
+    # settings is the cpu_tuning block of config.json.
+    # current_thread limits priority and affinity to the calling thread (Linux only), for in-process decoding,
+    # threads it starts afterwards inherit them. Otherwise they apply to the whole process, for worker processes.
+    if not settings:
+        return
+    tuning = dict(DEFAULT_TUNING)
+    tuning.update(settings)
+    set_thread_counts(tuning["intra_op_threads"], tuning["inter_op_threads"])
+    if tuning["priority"]:
+        set_priority(tuning["priority"], current_thread)
+    if tuning["affinity"]:
+        set_affinity(tuning["affinity"], current_thread)
+
+
+def set_thread_counts(intra_op_threads, inter_op_threads):
+    if not intra_op_threads and not inter_op_threads:
+        return
+    if "torch" not in sys.modules:
+        # Read by OpenMP/MKL when torch is imported, covers code that only imports it later
+        if intra_op_threads:
+            os.environ["OMP_NUM_THREADS"] = str(intra_op_threads)
+            os.environ["MKL_NUM_THREADS"] = str(intra_op_threads)
+    try:
+        import torch
+    except ImportError:
+        return
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError as e:
+            # Only possible before torch has run any parallel work in this process
+            logging.warning(f"Could not set inter-op threads to {inter_op_threads}: {e}")
+    logging.info("Torch threads: %d intra-op, %d inter-op.", torch.get_num_threads(), torch.get_num_interop_threads())
+
+
+def set_priority(priority, current_thread=False):
+    if priority not in PRIORITIES:
+        logging.error(f"Unknown priority '{priority}', expected one of {', '.join(PRIORITIES)}.")
+        return
+    nice_value, windows_class = PRIORITIES[priority]
+    try:
+        if current_thread:
+            if not sys.platform.startswith("linux"):
+                logging.warning("Per-thread priority needs Linux, use transcription_workers for a separate process.")
+                return
+            # On Linux a thread id works as a process id for setpriority
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice_value)
+        elif psutil is not None:
+            process = psutil.Process()
+            process.nice(getattr(psutil, windows_class) if sys.platform == "win32" else nice_value)
+        elif hasattr(os, "nice"):
+            os.nice(nice_value - os.nice(0))
+        else:
+            logging.warning("Setting the priority needs psutil on this platform: pip install psutil")
+            return
+        logging.info("Inference priority set to %s.", priority)
+    except (OSError, AttributeError) as e:
+        # Raising the priority usually needs admin rights
+        logging.warning(f"Could not set priority to {priority}: {e}")
+
+
+def set_affinity(cores, current_thread=False):
+    try:
+        if current_thread:
+            if not hasattr(os, "sched_setaffinity"):
+                logging.warning("Per-thread core pinning needs Linux, use transcription_workers for a separate process.")
+                return
+            # pid 0 is the calling thread
+            os.sched_setaffinity(0, cores)
+        elif psutil is not None:
+            psutil.Process().cpu_affinity(list(cores))
+        elif hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+        else:
+            logging.warning("Core pinning needs psutil on this platform: pip install psutil")
+            return
+        logging.info("Inference pinned to cores %s.", list(cores))
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not pin to cores {list(cores)}: {e}")
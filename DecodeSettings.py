@@ -0,0 +1,128 @@
+import collections
+import threading
+import logging
+import time
+
+# whisper's own temperature fallback schedule
+TEMPERATURE_FALLBACK = [0.0, 0.2, 0.4, 0.6, 0.8, 1.0]
+
+TASKS = ["translate", "transcribe"]
+
+# whisper only reads the last ~220 tokens of a prompt, this keeps it comfortably below that
+PROMPT_MAX_CHARS = 600
+
+# Used for any setting a profile leaves out, matches the old hard-coded behavior
+DEFAULT_PROFILE = {
+    "task": "translate",
+    "language": None,  # None detects the language on every clip
+    "beam_size": None,  # None decodes greedily
+    "temperature": TEMPERATURE_FALLBACK,
+    "condition_on_previous_text": True,
+    "sticky_language": False,
+    "carry_context": False,  # Prompt each clip with the previous one's text
+}
+
+
+class DecodeSettings:
+    def __init__(self, profiles=None, active_profile="default", sticky_clips=3, sticky_refresh=20, vocabulary=None,
+                 context_timeout=120.0):
+        self.profiles = profiles or {"default": dict(DEFAULT_PROFILE)}
+        self.active_profile = active_profile
+        self.lock = threading.Lock()
+
+        # Sticky language: once the last sticky_clips clips agree, detection is skipped.
+        # Every sticky_refresh clips one is detected again in case the speaker switched.
+        self.sticky_clips = sticky_clips
+        self.sticky_refresh = sticky_refresh
+        self.detected_languages = collections.deque(maxlen=sticky_clips)
+        self.sticky_uses = 0
+
+        # Session context: names and jargon the model should spell right, and the text of the last clip.
+        # Clips more than context_timeout seconds apart start a new session.
+        self.vocabulary = list(vocabulary or [])
+        self.context_timeout = context_timeout
+        self.previous_text = ""
+        self.previous_time = 0.0
+
+    def configure(self, config):
+        # config is the parsed config.json
+        with self.lock:
+            self.profiles = config.get('decode_profiles') or {"default": dict(DEFAULT_PROFILE)}
+            self.active_profile = config.get('decode_profile', 'default')
+            if self.active_profile not in self.profiles:
+                logging.error(f"Unknown decode profile '{self.active_profile}', using defaults.")
+                self.profiles[self.active_profile] = dict(DEFAULT_PROFILE)
+            self.sticky_clips = config.get('sticky_language_clips', self.sticky_clips)
+            self.sticky_refresh = config.get('sticky_language_refresh', self.sticky_refresh)
+            self.detected_languages = collections.deque(maxlen=self.sticky_clips)
+            self.sticky_uses = 0
+            self.vocabulary = list(config.get('vocabulary', []))
+            self.context_timeout = config.get('context_timeout', self.context_timeout)
+            self.previous_text = ""
+
+    def get_profile(self, name=None):
+        # Profile settings with the defaults filled in
+        with self.lock:
+            profile = dict(DEFAULT_PROFILE)
+            profile.update(self.profiles.get(name or self.active_profile, {}))
+            return profile
+
+    def get_options(self):
+        # Keyword arguments for model.transcribe, settings left at None use the backend default
+        profile = self.get_profile()
+        options = {"task": profile["task"], "condition_on_previous_text": profile["condition_on_previous_text"]}
+        temperature = profile["temperature"]
+        options["temperature"] = tuple(temperature) if isinstance(temperature, list) else temperature
+        if profile["beam_size"]:
+            options["beam_size"] = profile["beam_size"]
+
+        language = profile["language"] or (self.get_sticky_language() if profile["sticky_language"] else None)
+        if language:
+            options["language"] = language
+
+        initial_prompt = self.get_prompt(profile["carry_context"])
+        if initial_prompt:
+            options["initial_prompt"] = initial_prompt
+        return options
+
+    def depends_on_previous(self):
+        # The prompt or the sticky language come from the previous clip's result
+        profile = self.get_profile()
+        return profile["carry_context"] or (profile["sticky_language"] and not profile["language"])
+
+    def get_prompt(self, carry_context):
+        # Vocabulary first, then the end of the previous clip, which matters most for the next sentence
+        with self.lock:
+            prompt = ", ".join(self.vocabulary) + "." if self.vocabulary else ""
+            if carry_context and self.previous_text and time.monotonic() - self.previous_time < self.context_timeout:
+                room = PROMPT_MAX_CHARS - len(prompt) - 1
+                if room > 0:
+                    prompt = (prompt + " " + self.previous_text[-room:].lstrip()).lstrip()
+        return prompt or None
+
+    def get_sticky_language(self):
+        with self.lock:
+            if len(self.detected_languages) < self.sticky_clips or len(set(self.detected_languages)) != 1:
+                return None
+            self.sticky_uses += 1
+            if self.sticky_uses % self.sticky_refresh == 0:
+                return None
+            return self.detected_languages[-1]
+
+    def observe(self, options, result):
+        # Called with each final result, in the order the clips were recorded
+        if not isinstance(result, dict):
+            return
+        text = result.get("text", "").strip()
+        if text:
+            with self.lock:
+                self.previous_text = text
+                self.previous_time = time.monotonic()
+
+        # Only clips where the language was actually detected count towards the sticky language
+        if "language" in options or not result.get("language"):
+            return
+        with self.lock:
+            self.detected_languages.append(result["language"])
+            if len(self.detected_languages) == self.sticky_clips and len(set(self.detected_languages)) == 1:
+                logging.info("Language '%s' detected on the last %d clips.", result["language"], self.sticky_clips)
@@ -0,0 +1,132 @@
+import threading
+import logging
+import queue
+from pynput import mouse, keyboard
+
+# Modifier keys as pynput reports them -> the name used in shortcuts
+MODIFIERS = {
+    keyboard.Key.ctrl: "ctrl", keyboard.Key.ctrl_l: "ctrl", keyboard.Key.ctrl_r: "ctrl",
+    keyboard.Key.alt: "alt", keyboard.Key.alt_l: "alt", keyboard.Key.alt_r: "alt", keyboard.Key.alt_gr: "alt",
+    keyboard.Key.shift: "shift", keyboard.Key.shift_l: "shift", keyboard.Key.shift_r: "shift",
+    keyboard.Key.cmd: "cmd", keyboard.Key.cmd_l: "cmd", keyboard.Key.cmd_r: "cmd",
+}
+
+
+def parse_shortcut(shortcut):
+    # {"type": "mouse", "key": "x2"} or {"type": "keyboard", "key": "ctrl+Key.f4"} -> (trigger, modifiers)
+    key = str(shortcut.get('key', '')).strip()
+    if len(key) >= 3 and key[-1] == key[-3] == "'":
+        # A quoted character may itself be '+', split only what comes before it
+        name, prefix = key[-3:], key[:-3].rstrip('+')
+    else:
+        prefix, _, name = key.rpartition('+')
+    parts = [part.strip() for part in prefix.split('+') if part.strip()] + [name.strip()]
+    modifiers = frozenset(part.lower() for part in parts[:-1])
+    unknown = modifiers - set(MODIFIERS.values())
+    if unknown:
+        raise ValueError(f"Unknown modifier(s) {', '.join(sorted(unknown))} in {shortcut}")
+
+    name = parts[-1]
+    if shortcut.get('type') == 'mouse':
+        name = name[len("Button."):] if name.startswith("Button.") else name
+        return mouse.Button[name], modifiers
+
+    # Saved shortcuts look like str(key): Key.f4 for special keys, 'a' for characters
+    name = name[len("Key."):] if name.startswith("Key.") else name
+    if len(name) == 3 and name[0] == name[-1] == "'":
+        return keyboard.KeyCode.from_char(name[1]), modifiers
+    if len(name) == 1:
+        return keyboard.KeyCode.from_char(name.lower()), modifiers
+    return keyboard.Key[name.lower()], modifiers
+
+
+def normalize_key(key):
+    # Character keys compare by their lower case character, Ctrl+letter may arrive as a control character
+    if isinstance(key, keyboard.KeyCode) and key.char:
+        char = key.char
+        if len(char) == 1 and ord(char) < 32:
+            char = chr(ord(char) + 96)
+        return keyboard.KeyCode.from_char(char.lower())
+    return key
+
+
+class HotkeyDispatcher:
+    # Listener callbacks only look the event up in a prebuilt table and queue the handler,
+    # the handlers run on one persistent worker thread
+    def __init__(self):
+        # trigger -> [(modifiers, on_press, on_release)]
+        self.bindings = {}
+        self.held_modifiers = set()
+        self.held_triggers = {}
+        self.events = queue.SimpleQueue()
+
+        self.worker_thread = threading.Thread(target=self.run, name="hotkeys", daemon=True)
+        self.worker_thread.start()
+
+    def set_bindings(self, shortcuts):
+        # shortcuts are (shortcut config, on_press, on_release) triples, the new table replaces the old one at once
+        bindings = {}
+        for shortcut, on_press, on_release in shortcuts:
+            try:
+                trigger, modifiers = parse_shortcut(shortcut)
+            except (KeyError, ValueError) as e:
+                logging.error(f"Ignoring shortcut {shortcut}: {e}")
+                continue
+            bindings.setdefault(trigger, []).append((modifiers, on_press, on_release))
+        self.bindings = bindings
+
+    # injected is True for events sent by a program, e.g. our own paste macro (pynput 1.8+)
+    def on_click(self, x, y, button, pressed, injected=False):
+        if injected:
+            return
+        if pressed:
+            self.press(button)
+        else:
+            self.release(button)
+
+    def on_press(self, key, injected=False):
+        if injected:
+            return
+        modifier = MODIFIERS.get(key)
+        if modifier is not None:
+            self.held_modifiers.add(modifier)
+        self.press(normalize_key(key))
+
+    def on_release(self, key, injected=False):
+        if injected:
+            return
+        modifier = MODIFIERS.get(key)
+        if modifier is not None:
+            self.held_modifiers.discard(modifier)
+        self.release(normalize_key(key))
+
+    def press(self, trigger):
+        # Ignore key repeat while the key is held
+        if trigger in self.held_triggers:
+            return
+        # Modifiers must match exactly, so a plain "v" binding does not fire on Ctrl+V
+        for modifiers, on_press, on_release in self.bindings.get(trigger, ()):
+            if modifiers == self.held_modifiers:
+                self.held_triggers[trigger] = on_release
+                if on_press is not None:
+                    self.events.put(on_press)
+                return
+
+    def release(self, trigger):
+        # Releases go to the binding that matched the press, even if the modifiers changed since
+        on_release = self.held_triggers.pop(trigger, None)
+        if on_release is not None:
+            self.events.put(on_release)
+
+    def run(self):
+        while True:
+            handler = self.events.get()
+            if handler is None:
+                return
+            try:
+                handler()
+            except Exception as e:
+                logging.error("Error running shortcut action: ", exc_info=e)
+
+    def stop(self):
+        self.events.put(None)
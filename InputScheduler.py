@@ -0,0 +1,141 @@
+import concurrent.futures
+import threading
+import itertools
+import logging
+import heapq
+import time
+import pyperclip
+from pynput import keyboard
+
+# Seconds, tuned per game through input_profiles in config.json
+DEFAULT_TIMING = {
+    "chat_open_delay": 0.5,  # after opening the chat, before the first keep-alive
+    "keep_alive_interval": 1.0,  # between keep-alive rounds
+    "keep_alive_gap": 0.1,  # between space and backspace
+    "paste_delay": 0.1,  # after clearing the chat input, before pasting
+    "enter_delay": 0.1,  # after pasting, before Enter
+}
+
+
+class InputScheduler:
+    # One long-lived thread that runs timed key actions in order, instead of a thread and sleeps per action
+    def __init__(self, keyboard_controller, timing=None):
+        self.keyboard_controller = keyboard_controller
+        self.timing = dict(DEFAULT_TIMING)
+        self.timing.update(timing or {})
+
+        # Heap of (due, sequence, group, generation, action)
+        self.actions = []
+        self.sequence = itertools.count()
+        # Cancelling a group bumps its generation, queued actions from older generations are skipped
+        self.generations = {}
+        self.condition = threading.Condition()
+        self.running = True
+
+        self.worker_thread = threading.Thread(target=self.run, name="input-scheduler", daemon=True)
+        self.worker_thread.start()
+
+    def configure(self, config):
+        # config is the parsed config.json, input_profile picks the timing for the current game
+        profiles = config.get('input_profiles', {})
+        profile_name = config.get('input_profile', 'default')
+        if profiles and profile_name not in profiles:
+            logging.error(f"Unknown input profile '{profile_name}', using default timing.")
+        timing = dict(DEFAULT_TIMING)
+        timing.update(profiles.get(profile_name, {}))
+        self.timing = timing
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and (not self.actions or self.actions[0][0] > time.monotonic()):
+                    timeout = self.actions[0][0] - time.monotonic() if self.actions else None
+                    self.condition.wait(timeout)
+                if not self.running:
+                    return
+                _, _, group, generation, action = heapq.heappop(self.actions)
+                if generation != self.generations.get(group, 0):
+                    continue
+            try:
+                action()
+            except Exception as e:
+                logging.error(f"Error running input action: {e}")
+
+    def schedule(self, action, delay=0.0, group=None, generation=None):
+        # generation ties a follow-up action to the run it belongs to, it is dropped if that run was cancelled
+        with self.condition:
+            current = self.generations.get(group, 0)
+            if generation is not None and generation != current:
+                return
+            heapq.heappush(self.actions, (time.monotonic() + delay, next(self.sequence), group, current, action))
+            self.condition.notify()
+
+    def cancel(self, group):
+        with self.condition:
+            self.generations[group] = self.generations.get(group, 0) + 1
+            self.actions = [entry for entry in self.actions if entry[2] != group]
+            heapq.heapify(self.actions)
+            self.condition.notify()
+
+    def run_sequence(self, steps, group=None):
+        # steps are (delay, action) pairs, each delay counts from the end of the previous action.
+        # Returns a future that resolves once the last action has run.
+        future = concurrent.futures.Future()
+        with self.condition:
+            generation = self.generations.get(group, 0)
+
+        def run_step(index):
+            delay, action = steps[index]
+
+            def step():
+                try:
+                    action()
+                except Exception as e:
+                    future.set_exception(e)
+                    return
+                if index + 1 < len(steps):
+                    run_step(index + 1)
+                else:
+                    future.set_result(None)
+            self.schedule(step, delay, group, generation)
+
+        if steps:
+            run_step(0)
+        else:
+            future.set_result(None)
+        return future
+
+    def start_keep_alive(self):
+        # Opens the chat, then taps space and backspace so the chat stays open while recording
+        self.cancel("keep_alive")
+        with self.condition:
+            generation = self.generations.get("keep_alive", 0)
+
+        def keep_alive():
+            self.tap(keyboard.Key.space)
+            # Outside the keep_alive group, stopping right after the space must still remove it
+            self.schedule(lambda: self.tap(keyboard.Key.backspace), self.timing["keep_alive_gap"])
+            self.schedule(keep_alive, self.timing["keep_alive_interval"], "keep_alive", generation)
+
+        self.schedule(lambda: self.tap(keyboard.KeyCode.from_char('t')), 0.0, "keep_alive", generation)
+        self.schedule(keep_alive, self.timing["chat_open_delay"], "keep_alive", generation)
+
+    def stop_keep_alive(self):
+        self.cancel("keep_alive")
+
+    def tap(self, key):
+        self.keyboard_controller.press(key)
+        self.keyboard_controller.release(key)
+
+    def paste(self, text):
+        # Clipboard paste with Ctrl+V
+        pyperclip.copy(text)
+        with self.keyboard_controller.pressed(keyboard.Key.ctrl):
+            self.keyboard_controller.press('v')
+            self.keyboard_controller.release('v')
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.worker_thread.join(timeout=1.0)
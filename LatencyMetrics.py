@@ -0,0 +1,103 @@
+import contextlib
+import collections
+import threading
+import itertools
+import json
+import time
+import numpy as np
+
+# Stages in hot-path order, used to order the stats panel and exports
+STAGES = ["stop_capture", "buffer_view", "wav_write", "vad", "audio_convert", "queue_wait", "transcribe", "ui_update",
+          "release_to_text", "refine", "paste_macro", "release_to_paste"]
+
+
+class UtteranceTimings:
+    def __init__(self, utterance_id):
+        self.utterance_id = utterance_id
+        self.timestamp = time.time()
+        self.release_time = time.perf_counter()
+        self.spans = {}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start_time)
+
+    def record(self, name, seconds):
+        with self.lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def mark_since_release(self, name):
+        # Time from the button release until now, only the first mark counts
+        with self.lock:
+            if name not in self.spans:
+                self.spans[name] = time.perf_counter() - self.release_time
+
+    def to_dict(self):
+        with self.lock:
+            return {"utterance": self.utterance_id, "timestamp": self.timestamp, "spans": dict(self.spans)}
+
+
+class LatencyMetrics:
+    def __init__(self, max_utterances=200):
+        self.utterances = collections.deque(maxlen=max_utterances)
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def start_utterance(self):
+        timings = UtteranceTimings(next(self.ids))
+        with self.lock:
+            self.utterances.append(timings)
+        return timings
+
+    def last_utterance(self):
+        with self.lock:
+            return self.utterances[-1] if self.utterances else None
+
+    def stage_values(self):
+        values = collections.defaultdict(list)
+        with self.lock:
+            utterances = list(self.utterances)
+        for timings in utterances:
+            for name, seconds in timings.to_dict()["spans"].items():
+                values[name].append(seconds)
+        return values
+
+    def summary(self):
+        # {stage: {"last", "p50", "p95", "count", "sum"}} in hot-path order
+        values = self.stage_values()
+        ordered = [name for name in STAGES if name in values] + sorted(set(values) - set(STAGES))
+        return {name: {
+            "last": values[name][-1],
+            "p50": float(np.percentile(values[name], 50)),
+            "p95": float(np.percentile(values[name], 95)),
+            "count": len(values[name]),
+            "sum": float(sum(values[name])),
+        } for name in ordered}
+
+    def export_jsonl(self, path):
+        with self.lock:
+            utterances = list(self.utterances)
+        with open(path, 'w') as export_file:
+            for timings in utterances:
+                export_file.write(json.dumps(timings.to_dict()) + "\n")
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP wehspr_stage_seconds Time spent per hot-path stage of an utterance.",
+            "# TYPE wehspr_stage_seconds summary",
+        ]
+        for name, stats in self.summary().items():
+            lines.append(f'wehspr_stage_seconds{{stage="{name}",quantile="0.5"}} {stats["p50"]:.6f}')
+            lines.append(f'wehspr_stage_seconds{{stage="{name}",quantile="0.95"}} {stats["p95"]:.6f}')
+            lines.append(f'wehspr_stage_seconds_sum{{stage="{name}"}} {stats["sum"]:.6f}')
+            lines.append(f'wehspr_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path):
+        with open(path, 'w') as export_file:
+            export_file.write(self.prometheus_text())
@@ -0,0 +1,266 @@
+import collections
+import threading
+import logging
+import time
+import json
+import gc
+import os
+from TranscriptionBackend import create_backend, get_model_options
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class ModelRegistry:
+    def __init__(self, config_path='config.json', default_model_name="tiny"):
+        self.config_path = config_path
+        self.default_model_name = default_model_name
+
+        # Resolved once, on first use
+        self.model_name = None
+        self.backend_name = "whisper"
+        self.backend_options = {}
+        self.model = None
+
+        # Models kept warm by (backend, model, options), least recently used first.
+        # Besides the current model they are bounded by cache_budget_mb, 0 keeps only the current one.
+        self.warm_models = collections.OrderedDict()
+        self.cache_budget_mb = 0
+        self.loading = {}
+
+        # Models that must stay loaded next to the current one, e.g. the draft model
+        self.pinned_keys = set()
+
+        # Load stats per (backend, model name), seconds / bytes
+        self.load_stats = {}
+
+        self.lock = threading.RLock()
+
+    def resolve_model_name(self):
+        # Read the configured model name only once and remember it
+        with self.lock:
+            if self.model_name is not None:
+                return self.model_name
+            try:
+                with open(self.config_path, 'r') as config_file:
+                    config = json.load(config_file)
+                    self.model_name = config.get('model', self.default_model_name)
+                    self.backend_name = config.get('backend', 'whisper')
+                    self.backend_options = {
+                        "compute_type": config.get('compute_type', 'int8'),
+                        "cpu_threads": config.get('cpu_threads', 0),
+                    }
+                    self.cache_budget_mb = config.get('model_cache_mb', 0)
+            except (FileNotFoundError, json.JSONDecodeError) as e:
+                logging.error(f"Error reading model from config: {e}")
+                self.model_name = self.default_model_name
+        return self.model_name
+
+    def get_model(self):
+        # Everyone asking gets the same instance, loaded exactly once
+        model = self.model
+        if model is not None:
+            return model
+
+        model_name = self.resolve_model_name()
+        try:
+            return self.update_model(model_name)
+        except Exception as e:
+            if model_name == self.default_model_name:
+                raise
+            logging.error(f"Error loading model '{model_name}', falling back to '{self.default_model_name}': {e}")
+            return self.update_model(self.default_model_name)
+
+    def configure(self, model_name=None, backend_name=None, backend_options=None):
+        # Override the configured model without loading it, e.g. for worker processes or the CLI
+        with self.lock:
+            backend_name, backend_options = self.resolve_backend(backend_name, backend_options)
+            self.model_name = model_name or self.model_name
+            self.backend_name = backend_name
+            self.backend_options = backend_options
+
+    def get_named_model(self, model_name):
+        # A model other than the current one, kept loaded alongside it
+        with self.lock:
+            if model_name == self.resolve_model_name() and self.model is not None:
+                return self.model
+            backend_name, backend_options = self.resolve_backend(None, None)
+            self.pinned_keys.add(self.model_key(model_name, backend_name, backend_options))
+        return self.fetch_model(model_name, backend_name, backend_options)
+
+    def model_key(self, model_name, backend_name, backend_options):
+        return (backend_name, model_name, tuple(sorted(get_model_options(backend_name, backend_options).items())))
+
+    def current_key(self):
+        return self.model_key(self.model_name, self.backend_name, self.backend_options)
+
+    def resolve_backend(self, backend_name, backend_options):
+        # Backend settings come from the config unless given
+        self.resolve_model_name()
+        backend_name = backend_name or self.backend_name
+        backend_options = backend_options if backend_options is not None else self.backend_options
+        return backend_name, backend_options
+
+    def update_model(self, new_model_name, backend_name=None, backend_options=None):
+        with self.lock:
+            backend_name, backend_options = self.resolve_backend(backend_name, backend_options)
+            key = self.model_key(new_model_name, backend_name, backend_options)
+            if self.model is not None and key == self.current_key():
+                return self.model
+
+            # Not preloaded and no room for two models: free the old weights before loading the new ones
+            if key not in self.warm_models and key not in self.loading and self.cache_budget_mb <= 0:
+                self.unload_model()
+
+        model = self.fetch_model(new_model_name, backend_name, backend_options)
+
+        # Swap atomically, requests already running finish on the old model
+        with self.lock:
+            self.model = model
+            self.model_name = new_model_name
+            self.backend_name = backend_name
+            self.backend_options = backend_options
+            self.evict_models()
+        logging.info("Now using model '%s' (%s).", new_model_name, backend_name)
+        return model
+
+    def preload(self, model_name, backend_name=None, backend_options=None, callback=None):
+        # Load a model on a background thread without touching the one in use
+        with self.lock:
+            backend_name, backend_options = self.resolve_backend(backend_name, backend_options)
+
+        def run():
+            try:
+                self.fetch_model(model_name, backend_name, backend_options)
+                with self.lock:
+                    self.evict_models(keep=self.model_key(model_name, backend_name, backend_options))
+                error = None
+            except Exception as e:
+                logging.error(f"Error preloading model '{model_name}': {e}")
+                error = e
+            if callback is not None:
+                callback(model_name, error)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def switch_model(self, model_name, backend_name=None, backend_options=None, callback=None):
+        # Preload in the background, then swap; the current model keeps serving meanwhile
+        def swap(loaded_model_name, error):
+            if error is None:
+                try:
+                    self.update_model(model_name, backend_name, backend_options)
+                except Exception as e:
+                    error = e
+            if callback is not None:
+                callback(model_name, error)
+
+        self.preload(model_name, backend_name, backend_options, callback=swap)
+
+    def fetch_model(self, model_name, backend_name, backend_options):
+        # Return a warm model, wait for one that is already loading, or load it
+        key = self.model_key(model_name, backend_name, backend_options)
+        while True:
+            with self.lock:
+                if key in self.warm_models:
+                    self.warm_models.move_to_end(key)
+                    return self.warm_models[key]
+                loaded_event = self.loading.get(key)
+                if loaded_event is None:
+                    loaded_event = threading.Event()
+                    self.loading[key] = loaded_event
+                    break
+            loaded_event.wait()
+
+        try:
+            model = self.load_model(model_name, backend_name, backend_options)
+            with self.lock:
+                self.warm_models[key] = model
+            return model
+        finally:
+            with self.lock:
+                self.loading.pop(key, None)
+            loaded_event.set()
+
+    def evict_models(self, keep=None):
+        # Drop least recently used models until the warm set fits the RAM budget
+        protected = {self.current_key(), keep} | self.pinned_keys
+        budget = self.cache_budget_mb * 1024 * 1024
+        evicted = False
+        for key in list(self.warm_models):
+            if key in protected:
+                continue
+            if budget > 0 and self.warm_memory() <= budget:
+                break
+            logging.info("Evicting warm model '%s' (%s)", key[1], key[0])
+            del self.warm_models[key]
+            evicted = True
+        if evicted:
+            gc.collect()
+            self.empty_device_cache()
+
+    def warm_memory(self):
+        # Estimated from the RSS growth measured while each model loaded
+        total = 0
+        for backend_name, model_name, _ in self.warm_models:
+            stats = self.load_stats.get((backend_name, model_name), {})
+            if stats.get("rss_before") is not None and stats.get("rss_after") is not None:
+                total += max(stats["rss_after"] - stats["rss_before"], 0)
+        return total
+
+    def unload_model(self):
+        with self.lock:
+            if self.model is None:
+                return
+            logging.info("Unloading model '%s'", self.model_name)
+            self.warm_models.pop(self.current_key(), None)
+            self.model = None
+            gc.collect()
+            self.empty_device_cache()
+
+    def load_model(self, model_name, backend_name, backend_options):
+        logging.info("Loading model '%s' with the %s backend...", model_name, backend_name)
+        rss_before = self.get_resident_memory()
+        start_time = time.perf_counter()
+
+        model = create_backend(backend_name, model_name, **backend_options)
+
+        load_time = time.perf_counter() - start_time
+        rss_after = self.get_resident_memory()
+        self.load_stats[(backend_name, model_name)] = {
+            "load_time": load_time,
+            "rss_before": rss_before,
+            "rss_after": rss_after,
+        }
+        logging.info("Model '%s' loaded in %.2fs, resident memory %s (was %s)",
+                     model_name, load_time, self.format_bytes(rss_after), self.format_bytes(rss_before))
+        return model
+
+    def empty_device_cache(self):
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def get_resident_memory(self):
+        # Current RSS of this process in bytes, None if it cannot be measured
+        if psutil is not None:
+            return psutil.Process(os.getpid()).memory_info().rss
+        try:
+            with open('/proc/self/statm', 'r') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+
+    @staticmethod
+    def format_bytes(value):
+        if value is None:
+            return "n/a"
+        return f"{value / (1024 * 1024):.0f} MiB"
+
+
+# Shared registry for the whole process
+model_registry = ModelRegistry()
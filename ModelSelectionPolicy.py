@@ -0,0 +1,67 @@
+import threading
+import logging
+import json
+
+
+class ModelSelectionPolicy:
+    # Picks the model for each utterance so it stays within the latency budget.
+    # Candidates are ordered best first, the first one predicted to fit the budget wins.
+    def __init__(self, candidates, latency_budget=2.0, default_rtf=0.5, smoothing=0.3):
+        self.candidates = list(candidates)
+        self.latency_budget = latency_budget
+        self.default_rtf = default_rtf
+        self.smoothing = smoothing
+
+        # Real-time factor (decode seconds per audio second) per model, exponentially weighted
+        self.real_time_factors = {}
+        # Average seconds per job, to estimate the wait behind queued jobs
+        self.job_seconds = None
+        self.lock = threading.Lock()
+
+    def load_benchmark(self, path, backend_name):
+        # Seed the estimates from a benchmark.py report made on this machine
+        try:
+            with open(path, 'r') as report_file:
+                results = json.load(report_file).get('results', [])
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"Error reading benchmark report {path}: {e}")
+            return
+        with self.lock:
+            for result in results:
+                if result.get('backend') == backend_name and result.get('real_time_factor') is not None:
+                    self.real_time_factors[result['model']] = result['real_time_factor']
+        logging.info("Model policy seeded from %s: %s", path, self.real_time_factors)
+
+    def predict(self, model_name, audio_seconds, queue_depth):
+        with self.lock:
+            real_time_factor = self.real_time_factors.get(model_name, self.default_rtf)
+            wait_seconds = queue_depth * (self.job_seconds or 0.0)
+        return wait_seconds + real_time_factor * audio_seconds
+
+    def choose(self, audio_seconds, queue_depth=0):
+        predictions = [(model_name, self.predict(model_name, audio_seconds, queue_depth))
+                       for model_name in self.candidates]
+        fitting = [prediction for prediction in predictions if prediction[1] <= self.latency_budget]
+        # Nothing fits, take whatever is predicted to be fastest
+        model_name, predicted = fitting[0] if fitting else min(predictions, key=lambda prediction: prediction[1])
+
+        logging.info("Model policy: %.2fs clip, %d queued, budget %.2fs -> %s (predicted %.2fs). Predictions: %s",
+                     audio_seconds, queue_depth, self.latency_budget, model_name, predicted,
+                     ", ".join(f"{name} {seconds:.2f}s" for name, seconds in predictions))
+        return model_name
+
+    def observe(self, model_name, audio_seconds, decode_seconds):
+        # Called with each finished decode, cache hits should not be passed in
+        if audio_seconds <= 0:
+            return
+        real_time_factor = decode_seconds / audio_seconds
+        with self.lock:
+            previous = self.real_time_factors.get(model_name)
+            if previous is None:
+                self.real_time_factors[model_name] = real_time_factor
+            else:
+                self.real_time_factors[model_name] = previous + self.smoothing * (real_time_factor - previous)
+            if self.job_seconds is None:
+                self.job_seconds = decode_seconds
+            else:
+                self.job_seconds += self.smoothing * (decode_seconds - self.job_seconds)
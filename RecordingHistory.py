@@ -0,0 +1,193 @@
+import concurrent.futures
+import threading
+import logging
+import queue
+import wave
+import json
+import time
+import os
+
+# Output format -> (file extension, soundfile format, soundfile subtype)
+AUDIO_FORMATS = {
+    "flac": (".flac", "FLAC", "PCM_16"),
+    "opus": (".ogg", "OGG", "OPUS"),
+    "wav": (".wav", None, None),
+}
+AUDIO_EXTENSIONS = tuple(extension for extension, _, _ in AUDIO_FORMATS.values())
+
+
+class RecordingHistory:
+    # Recordings and their transcripts, written on one background thread and indexed in index.json
+    def __init__(self, folder="recordings", max_count=3, max_age_days=None, max_mb=None, audio_format="flac",
+                 sample_rate=16000):
+        self.folder = folder
+        self.index_path = os.path.join(folder, "index.json")
+        self.max_count = max_count
+        self.max_age_seconds = max_age_days * 86400 if max_age_days else None
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb else None
+        self.audio_format = audio_format if audio_format in AUDIO_FORMATS else "wav"
+        self.sample_rate = sample_rate
+
+        # Only touched on the writer thread
+        self.entries = []
+        # Names handed out but maybe not written yet, guarded by names_lock
+        self.reserved_names = set()
+        self.names_lock = threading.Lock()
+
+        self.tasks = queue.Queue()
+        self.writer_thread = threading.Thread(target=self.run, name="recording-history", daemon=True)
+        self.writer_thread.start()
+        self.tasks.put(self.load_index)
+
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+            try:
+                task()
+            except Exception as e:
+                logging.error("Error updating the recording history: ", exc_info=e)
+
+    def add(self, audio_samples, timings=None, **metadata):
+        # Returns the recording's name right away and a future of its path once it is on disk
+        name = self.reserve_name()
+        future = concurrent.futures.Future()
+        self.tasks.put(lambda: self.write_recording(name, audio_samples, metadata, timings, future))
+        return name, future
+
+    def update(self, name, **metadata):
+        # e.g. the transcript once it is known
+        self.tasks.put(lambda: self.update_entry(name, metadata))
+
+    def reserve_name(self):
+        # Millisecond timestamps, with a counter for recordings within the same millisecond
+        now = time.time()
+        base_name = "recording_" + time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+        with self.names_lock:
+            name, counter = base_name, 1
+            while name in self.reserved_names:
+                counter += 1
+                name = f"{base_name}-{counter}"
+            self.reserved_names.add(name)
+        return name
+
+    def write_recording(self, name, audio_samples, metadata, timings, future):
+        start_time = time.perf_counter()
+        try:
+            path = self.write_audio(name, audio_samples)
+        except Exception as e:
+            with self.names_lock:
+                self.reserved_names.discard(name)
+            future.set_exception(e)
+            raise
+        if timings is not None:
+            timings.record("wav_write", time.perf_counter() - start_time)
+
+        entry = {"name": name, "file": os.path.basename(path), "created": time.time(),
+                 "duration": len(audio_samples) / self.sample_rate, "size": os.path.getsize(path)}
+        entry.update(metadata)
+        self.entries.append(entry)
+        self.apply_retention()
+        self.save_index()
+        future.set_result(path)
+
+    def write_audio(self, name, audio_samples):
+        extension, file_format, subtype = AUDIO_FORMATS[self.audio_format]
+        if file_format is not None:
+            try:
+                import soundfile
+                path = os.path.join(self.folder, name + extension)
+                soundfile.write(path, audio_samples, self.sample_rate, format=file_format, subtype=subtype)
+                return path
+            except ImportError:
+                logging.warning("soundfile is not installed, saving recordings as WAV.")
+                self.audio_format = "wav"
+            except Exception as e:
+                logging.warning(f"Could not save {name} as {self.audio_format}, saving it as WAV: {e}")
+
+        path = os.path.join(self.folder, name + ".wav")
+        with wave.open(path, 'wb') as wavefile:
+            wavefile.setnchannels(1)
+            wavefile.setsampwidth(2)
+            wavefile.setframerate(self.sample_rate)
+            wavefile.writeframes(memoryview(audio_samples).cast('B'))
+        return path
+
+    def update_entry(self, name, metadata):
+        for entry in self.entries:
+            if entry["name"] == name:
+                entry.update(metadata)
+                self.save_index()
+                return
+
+    def apply_retention(self):
+        # Oldest first, until the count, age and size limits all hold
+        self.entries.sort(key=lambda entry: entry["created"])
+        total_bytes = sum(entry.get("size", 0) for entry in self.entries)
+        oldest_allowed = time.time() - self.max_age_seconds if self.max_age_seconds else None
+        while self.entries:
+            entry = self.entries[0]
+            if not ((self.max_count is not None and len(self.entries) > self.max_count)
+                    or (oldest_allowed is not None and entry["created"] < oldest_allowed)
+                    or (self.max_bytes is not None and total_bytes > self.max_bytes)):
+                break
+            self.entries.pop(0)
+            total_bytes -= entry.get("size", 0)
+            self.remove_file(entry)
+
+    def remove_file(self, entry):
+        path = os.path.join(self.folder, entry["file"])
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logging.error(f"Error removing recording {path}: {e}")
+        with self.names_lock:
+            self.reserved_names.discard(entry["name"])
+
+    def load_index(self):
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as index_file:
+                entries = json.load(index_file).get('recordings', [])
+        except FileNotFoundError:
+            entries = []
+        except (json.JSONDecodeError, AttributeError) as e:
+            logging.error(f"Error reading {self.index_path}, rebuilding it: {e}")
+            entries = []
+
+        # Drop entries whose file is gone, adopt files left behind without an entry
+        entries = [entry for entry in entries if os.path.exists(os.path.join(self.folder, entry.get("file", "")))]
+        indexed_files = {entry["file"] for entry in entries}
+        for file_name in os.listdir(self.folder):
+            if file_name.lower().endswith(AUDIO_EXTENSIONS) and file_name not in indexed_files:
+                path = os.path.join(self.folder, file_name)
+                entries.append({"name": os.path.splitext(file_name)[0], "file": file_name,
+                                "created": os.path.getmtime(path), "size": os.path.getsize(path)})
+
+        # Recordings added before the index was read are already in self.entries
+        self.entries = entries + self.entries
+        with self.names_lock:
+            self.reserved_names.update(entry["name"] for entry in self.entries)
+        self.apply_retention()
+        self.save_index()
+
+    def save_index(self):
+        # Written to a temporary file first, so a crash never leaves a half-written index
+        temporary_path = self.index_path + ".tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as index_file:
+            json.dump({"recordings": self.entries}, index_file, ensure_ascii=False, indent=1)
+        os.replace(temporary_path, self.index_path)
+
+    def get_entries(self):
+        # Snapshot of the index, newest last
+        future = concurrent.futures.Future()
+        self.tasks.put(lambda: future.set_result([dict(entry) for entry in self.entries]))
+        return future.result()
+
+    def close(self):
+        # Finishes the queued writes before returning
+        self.tasks.put(None)
+        self.writer_thread.join()
@@ -0,0 +1,98 @@
+import threading
+import logging
+
+
+class StreamingTranscriber:
+    def __init__(self, transcribe, get_audio, on_partial=None, sample_rate=16000,
+                 interval=1.0, min_window=1.0, max_window=25.0):
+        # transcribe(audio) -> whisper style result, get_audio(start_sample) -> float32 array
+        self.transcribe = transcribe
+        self.get_audio = get_audio
+        self.on_partial = on_partial
+        self.sample_rate = sample_rate
+
+        # Seconds between passes, and the window sizes decoded per pass
+        self.interval = interval
+        self.min_window = min_window
+        self.max_window = max_window
+
+        self.committed_sample = 0
+        self.committed_text = []
+        self.previous_segments = []
+        self.lock = threading.Lock()
+
+        self.stop_event = threading.Event()
+        self.worker_thread = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.worker_thread = threading.Thread(target=self.run, daemon=True)
+        self.worker_thread.start()
+
+    def run(self):
+        logging.info("Streaming transcription started.")
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.transcribe_window()
+            except Exception as e:
+                logging.error("Error during streaming transcription: ", exc_info=e)
+
+    def transcribe_window(self):
+        with self.lock:
+            audio = self.get_audio(self.committed_sample)
+            if len(audio) < self.min_window * self.sample_rate:
+                return
+
+            result = self.transcribe(audio)
+            segments = result.get('segments', [])
+
+            # The last segment may be cut mid-word, only earlier ones can be committed
+            stable_count = self.count_stable_segments(segments[:-1])
+
+            # Never let the unconfirmed window grow past what the model can see at once
+            if stable_count == 0 and len(audio) > self.max_window * self.sample_rate:
+                stable_count = max(len(segments) - 1, 0)
+
+            for segment in segments[:stable_count]:
+                self.committed_text.append(segment['text'].strip())
+            if stable_count:
+                self.committed_sample += int(segments[stable_count - 1]['end'] * self.sample_rate)
+            self.previous_segments = segments[stable_count:]
+
+            partial_text = [segment['text'].strip() for segment in self.previous_segments]
+            if self.on_partial is not None:
+                self.on_partial(self.join_text(self.committed_text + partial_text))
+
+    def count_stable_segments(self, segments):
+        # A segment is stable once two consecutive passes agree on it
+        stable_count = 0
+        for segment, previous in zip(segments, self.previous_segments):
+            if segment['text'].strip() != previous['text'].strip():
+                break
+            stable_count += 1
+        return stable_count
+
+    def stop(self, get_audio=None):
+        # Ends the passes without waiting, get_audio replaces the live source with the final audio,
+        # so finish() decodes this recording even if the buffer has moved on to the next one
+        if get_audio is not None:
+            self.get_audio = get_audio
+        self.stop_event.set()
+
+    def finish(self):
+        # Stop the worker and decode only the unconfirmed tail
+        self.stop_event.set()
+        if self.worker_thread is not None:
+            self.worker_thread.join()
+
+        with self.lock:
+            tail = self.get_audio(self.committed_sample)
+            tail_text = ""
+            if len(tail) > 0:
+                tail_text = self.transcribe(tail)['text'].strip()
+            logging.info("Streaming transcription finished, decoded %.2fs tail.", len(tail) / self.sample_rate)
+            return self.join_text(self.committed_text + [tail_text])
+
+    @staticmethod
+    def join_text(parts):
+        return " ".join(part for part in parts if part)
@@ -0,0 +1,93 @@
+import logging
+
+
+class WhisperBackend:
+    # openai-whisper on PyTorch, the default
+    name = "whisper"
+
+    # Backend options that change the loaded model, the rest are ignored
+    model_options = ()
+
+    def __init__(self, model_name, **backend_options):
+        import whisper
+        self.model_name = model_name
+        self.model = whisper.load_model(model_name)
+        self.warm_up_features(whisper)
+
+    def warm_up_features(self, whisper):
+        # The mel filterbank is read from disk and moved to the device on first use and cached after that,
+        # one second of silence does it at load time instead of on the first recording
+        try:
+            # Imported here, the UI imports this module before its first frame
+            import numpy as np
+            silence = np.zeros(whisper.audio.SAMPLE_RATE, dtype=np.float32)
+            whisper.log_mel_spectrogram(silence, self.model.dims.n_mels, device=self.model.device)
+        except Exception as e:
+            logging.warning(f"Could not precompute the mel filterbank: {e}")
+
+    def transcribe(self, audio_input, **options):
+        return self.model.transcribe(audio_input, **options)
+
+
+class FasterWhisperBackend:
+    # faster-whisper on CTranslate2, quantized weights make it much faster on CPU
+    name = "faster-whisper"
+
+    model_options = ("compute_type", "cpu_threads", "device", "batch_size")
+
+    # whisper-only options faster-whisper does not accept
+    unsupported_options = ("fp16", "verbose")
+
+    def __init__(self, model_name, compute_type="int8", cpu_threads=0, device="cpu", batch_size=1,
+                 **backend_options):
+        from faster_whisper import WhisperModel
+        self.model_name = model_name
+        self.model = WhisperModel(model_name, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+        # Batched decoding of the VAD-split segments of one file, for long offline files
+        self.batch_size = batch_size
+        self.pipeline = None
+        if batch_size > 1:
+            from faster_whisper import BatchedInferencePipeline
+            self.pipeline = BatchedInferencePipeline(model=self.model)
+
+    def transcribe(self, audio_input, **options):
+        for option in self.unsupported_options:
+            options.pop(option, None)
+        # faster-whisper searches 5 beams by default, whisper and the decode profiles mean greedy when it is unset
+        options.setdefault("beam_size", 1)
+
+        # Segments are generated lazily, decoding happens while iterating
+        if self.pipeline is not None:
+            segments, info = self.pipeline.transcribe(audio_input, batch_size=self.batch_size, **options)
+        else:
+            segments, info = self.model.transcribe(audio_input, **options)
+        segments = [{"start": segment.start, "end": segment.end, "text": segment.text} for segment in segments]
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": info.language,
+        }
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+# Quantization choices offered for faster-whisper
+COMPUTE_TYPES = ["int8", "int8_float16", "int8_float32", "float16", "float32"]
+
+
+def get_model_options(backend_name, backend_options):
+    # Only the options this backend uses, so changing e.g. compute_type on whisper does not reload the same weights
+    backend_class = BACKENDS.get(backend_name, WhisperBackend)
+    return {name: value for name, value in backend_options.items() if name in backend_class.model_options}
+
+
+def create_backend(backend_name, model_name, **backend_options):
+    backend_class = BACKENDS.get(backend_name)
+    if backend_class is None:
+        logging.error(f"Unknown backend '{backend_name}', using '{WhisperBackend.name}'.")
+        backend_class = WhisperBackend
+    return backend_class(model_name, **backend_options)
@@ -0,0 +1,90 @@
+import threading
+import hashlib
+import logging
+import sqlite3
+import json
+import time
+import os
+import numpy as np
+
+
+class TranscriptionCache:
+    def __init__(self, path="cache/transcriptions.sqlite3", max_mb=64):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # One connection shared by the worker threads, guarded by the lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS transcriptions (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    segments TEXT NOT NULL,
+                    language TEXT,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS transcriptions_last_access ON transcriptions (last_access)")
+            self.connection.commit()
+
+    def make_key(self, audio_input, model_name, backend_name, backend_options, options):
+        # Content address: the audio itself plus everything that changes the output
+        digest = hashlib.sha256()
+        if isinstance(audio_input, np.ndarray):
+            digest.update(np.ascontiguousarray(audio_input).tobytes())
+        else:
+            with open(audio_input, 'rb') as audio_file:
+                for block in iter(lambda: audio_file.read(1024 * 1024), b''):
+                    digest.update(block)
+        settings = {"model": model_name, "backend": backend_name,
+                    "backend_options": backend_options, "options": options}
+        digest.update(json.dumps(settings, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT text, segments, language FROM transcriptions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE transcriptions SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+        return {"text": row[0], "segments": json.loads(row[1]), "language": row[2],
+                "decode_seconds": 0.0, "cached": True}
+
+    def put(self, key, result):
+        segments = json.dumps(result.get("segments", []))
+        size = len(result["text"].encode('utf-8')) + len(segments)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO transcriptions (key, text, segments, language, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, result["text"], segments, result.get("language"), size, time.time()))
+            self.evict()
+            self.connection.commit()
+
+    def evict(self):
+        # Least recently used entries go first, until the store fits max_mb
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM transcriptions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        removed = 0
+        for key, size in self.connection.execute(
+                "SELECT key, size FROM transcriptions ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.connection.execute("DELETE FROM transcriptions WHERE key = ?", (key,))
+            total -= size
+            removed += 1
+        logging.info("Transcription cache evicted %d entries.", removed)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,59 @@
+import http.client
+import urllib.parse
+import json
+
+
+class TranscriptionServerError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class TranscriptionClient:
+    # Small client for the local transcription server, audio is raw 16 kHz mono s16le PCM bytes
+    def __init__(self, host="127.0.0.1", port=8765, client_id=None, timeout=120.0):
+        self.host = host
+        self.port = port
+        self.client_id = client_id
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, **query):
+        query = {name: value for name, value in query.items() if value is not None}
+        if query:
+            path += "?" + urllib.parse.urlencode(query)
+        headers = {"Content-Type": "application/octet-stream"}
+        if self.client_id:
+            headers["X-Client-Id"] = self.client_id
+
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = json.loads(response.read() or b"{}")
+        finally:
+            connection.close()
+        if response.status >= 400:
+            raise TranscriptionServerError(response.status, payload.get("error", response.reason))
+        return payload
+
+    def status(self):
+        return self.request("GET", "/status")
+
+    def transcribe(self, pcm, task=None, language=None):
+        return self.request("POST", "/transcribe", pcm, task=task, language=language)
+
+    def start_session(self, partials=True, task=None, language=None):
+        return self.request("POST", "/sessions", partials=int(partials), task=task, language=language)["session"]
+
+    def send_audio(self, session_id, pcm):
+        # Returns the latest partial text
+        return self.request("POST", f"/sessions/{session_id}/audio", pcm)["partial"]
+
+    def get_partial(self, session_id):
+        return self.request("GET", f"/sessions/{session_id}")["partial"]
+
+    def finish(self, session_id):
+        return self.request("POST", f"/sessions/{session_id}/finish")
+
+    def cancel(self, session_id):
+        self.request("DELETE", f"/sessions/{session_id}")
@@ -0,0 +1,322 @@
+import http.server
+import functools
+import threading
+import logging
+import json
+import time
+import uuid
+import urllib.parse
+import numpy as np
+from AudioBuffer import AudioBuffer, pcm_to_float32
+from StreamingTranscriber import StreamingTranscriber
+
+SAMPLE_RATE = 16000
+
+
+class TranscriptionSession:
+    # One client stream: PCM chunks appended as they arrive, optional partial results while it runs
+    def __init__(self, client_id, transcribe, options, partials=False, max_duration=300.0):
+        self.session_id = uuid.uuid4().hex
+        self.client_id = client_id
+        self.options = options
+        self.transcribe = transcribe
+        self.audio_buffer = AudioBuffer(SAMPLE_RATE, max_duration)
+        self.lock = threading.Lock()
+        self.partial_text = ""
+        self.last_activity = time.monotonic()
+        # Chunks may split a sample, its first byte waits here for the next chunk
+        self.pending_byte = b""
+
+        self.streaming_transcriber = None
+        if partials:
+            self.streaming_transcriber = StreamingTranscriber(lambda audio: self.transcribe(audio, options),
+                                                              self.get_audio, on_partial=self.set_partial,
+                                                              sample_rate=SAMPLE_RATE)
+            self.streaming_transcriber.start()
+
+    def append(self, data):
+        with self.lock:
+            if self.pending_byte:
+                data = self.pending_byte + data
+            if len(data) % 2:
+                data, self.pending_byte = data[:-1], data[-1:]
+            else:
+                self.pending_byte = b""
+            self.audio_buffer.append(data)
+            self.last_activity = time.monotonic()
+
+    def get_audio(self, start_sample=0):
+        with self.lock:
+            return pcm_to_float32(self.audio_buffer.view(start_sample))
+
+    def set_partial(self, text):
+        self.partial_text = text
+
+    def finish(self):
+        # Final text for the whole stream, only the unconfirmed tail is decoded when partials were running
+        if self.streaming_transcriber is not None:
+            text = self.streaming_transcriber.finish()
+            return {"text": text, "duration": self.audio_buffer.duration}
+        audio = self.get_audio()
+        if len(audio) == 0:
+            return {"text": "", "segments": [], "language": None, "duration": 0.0}
+        result = dict(self.transcribe(audio, self.options))
+        result["duration"] = self.audio_buffer.duration
+        return result
+
+    def close(self):
+        if self.streaming_transcriber is not None:
+            self.streaming_transcriber.stop()
+
+
+class ClientLimitError(Exception):
+    pass
+
+
+class BadRequestError(Exception):
+    pass
+
+
+class TranscriptionServer:
+    # Local HTTP API in front of one TranscriptionService, so several tools share one warm model
+    def __init__(self, transcription_service, decode_settings, host="127.0.0.1", port=8765,
+                 max_sessions_per_client=2, max_requests_per_client=2, session_timeout=300.0):
+        self.transcription_service = transcription_service
+        self.decode_settings = decode_settings
+        self.max_sessions_per_client = max_sessions_per_client
+        self.max_requests_per_client = max_requests_per_client
+        self.session_timeout = session_timeout
+
+        self.sessions = {}
+        self.active_requests = {}
+        self.lock = threading.Lock()
+        self.request_finished = threading.Condition(self.lock)
+        self.stopped = threading.Event()
+
+        self.http_server = http.server.ThreadingHTTPServer((host, port), TranscriptionRequestHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.app = self
+
+    @property
+    def address(self):
+        return self.http_server.server_address
+
+    def serve_forever(self):
+        logging.info("Transcription server listening on http://%s:%d", *self.address[:2])
+        # Abandoned streams would otherwise keep decoding on the shared model
+        threading.Thread(target=self.expire_sessions_periodically, name="session-expiry", daemon=True).start()
+        self.http_server.serve_forever()
+
+    def expire_sessions_periodically(self):
+        interval = max(min(self.session_timeout / 2, 30.0), 0.5)
+        while not self.stopped.wait(interval):
+            self.expire_sessions()
+
+    def start(self):
+        # Serve on a background thread, e.g. next to the UI or in tests
+        thread = threading.Thread(target=self.serve_forever, name="transcription-server", daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        self.stopped.set()
+        self.http_server.shutdown()
+        self.http_server.server_close()
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def get_options(self, query):
+        # The active decode profile, task and language can be overridden per request
+        options = self.decode_settings.get_options()
+        for name in ("task", "language"):
+            if name in query:
+                options[name] = query[name]
+        return options
+
+    def transcribe(self, audio, options):
+        return self.transcription_service.transcribe(audio, use_cache=False, **options)
+
+    def begin_request(self, client_id, wait=False):
+        # Caps the decodes a single client has in flight, so one tool cannot starve the others.
+        # wait=True blocks until one of them finishes instead of failing.
+        with self.lock:
+            while self.active_requests.get(client_id, 0) >= self.max_requests_per_client:
+                if not wait:
+                    raise ClientLimitError(f"Client {client_id} already has "
+                                           f"{self.active_requests[client_id]} request(s) in progress")
+                self.request_finished.wait()
+            self.active_requests[client_id] = self.active_requests.get(client_id, 0) + 1
+
+    def end_request(self, client_id):
+        with self.lock:
+            self.active_requests[client_id] -= 1
+            if not self.active_requests[client_id]:
+                del self.active_requests[client_id]
+            self.request_finished.notify_all()
+
+    def transcribe_streaming(self, client_id, audio, options):
+        # Partial passes and the final tail of a stream count towards the client's limit too,
+        # they wait for a free slot since nobody is there to retry them
+        self.begin_request(client_id, wait=True)
+        try:
+            return self.transcribe(audio, options)
+        finally:
+            self.end_request(client_id)
+
+    def transcribe_pcm(self, client_id, data, query):
+        if len(data) % 2:
+            raise BadRequestError(f"Expected 16-bit PCM, got an odd number of bytes ({len(data)})")
+        self.begin_request(client_id)
+        try:
+            audio = pcm_to_float32(np.frombuffer(data, dtype=np.int16))
+            if len(audio) == 0:
+                return {"text": "", "segments": [], "language": None}
+            return self.transcribe(audio, self.get_options(query))
+        finally:
+            self.end_request(client_id)
+
+    def create_session(self, client_id, query):
+        self.expire_sessions()
+        with self.lock:
+            client_sessions = sum(1 for session in self.sessions.values() if session.client_id == client_id)
+            if client_sessions >= self.max_sessions_per_client:
+                raise ClientLimitError(f"Client {client_id} already has {client_sessions} open session(s)")
+            partials = query.get("partials", "0") not in ("0", "false", "")
+            transcribe = functools.partial(self.transcribe_streaming, client_id) if partials else self.transcribe
+            session = TranscriptionSession(client_id, transcribe, self.get_options(query), partials)
+            self.sessions[session.session_id] = session
+        logging.info("Session %s opened for %s.", session.session_id, client_id)
+        return session
+
+    def get_session(self, client_id, session_id):
+        with self.lock:
+            session = self.sessions.get(session_id)
+        if session is None or session.client_id != client_id:
+            raise KeyError(session_id)
+        return session
+
+    def finish_session(self, client_id, session_id):
+        session = self.get_session(client_id, session_id)
+        # A streaming session counts its own decodes
+        counted = session.streaming_transcriber is None
+        if counted:
+            self.begin_request(client_id)
+        try:
+            return session.finish()
+        finally:
+            if counted:
+                self.end_request(client_id)
+            with self.lock:
+                self.sessions.pop(session_id, None)
+
+    def close_session(self, client_id, session_id):
+        session = self.get_session(client_id, session_id)
+        with self.lock:
+            self.sessions.pop(session_id, None)
+        session.close()
+
+    def expire_sessions(self):
+        # Sessions a client forgot to finish
+        now = time.monotonic()
+        with self.lock:
+            expired = [session for session in self.sessions.values()
+                       if now - session.last_activity > self.session_timeout]
+            for session in expired:
+                del self.sessions[session.session_id]
+        for session in expired:
+            logging.info("Session %s expired.", session.session_id)
+            session.close()
+
+    def get_status(self):
+        with self.lock:
+            sessions = len(self.sessions)
+        registry = self.transcription_service.model_registry
+        return {"model": registry.model_name, "backend": registry.backend_name, "sessions": sessions,
+                "queue_depth": self.transcription_service.queue_depth}
+
+
+class TranscriptionRequestHandler(http.server.BaseHTTPRequestHandler):
+    # POST /transcribe                 raw 16 kHz mono s16le PCM -> final result
+    # POST /sessions?partials=1        -> {"session": id}
+    # POST /sessions/<id>/audio        PCM chunk -> {"partial", "duration"}
+    # GET  /sessions/<id>              -> {"partial", "duration"}
+    # POST /sessions/<id>/finish       -> final result, closes the session
+    # DELETE /sessions/<id>            closes the session without decoding
+    # GET  /status                     -> model, backend, open sessions, queue depth
+    # task and language can be passed as query parameters, the X-Client-Id header names the client
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def app(self):
+        return self.server.app
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def do_DELETE(self):
+        self.handle_request("DELETE")
+
+    def handle_request(self, method):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        query = dict(urllib.parse.parse_qsl(url.query))
+        client_id = self.headers.get("X-Client-Id") or self.client_address[0]
+        body = self.read_body()
+        try:
+            if method == "GET" and parts == ["status"]:
+                self.send_json(200, self.app.get_status())
+            elif method == "POST" and parts == ["transcribe"]:
+                self.send_json(200, self.app.transcribe_pcm(client_id, body, query))
+            elif method == "POST" and parts == ["sessions"]:
+                session = self.app.create_session(client_id, query)
+                self.send_json(201, {"session": session.session_id})
+            elif len(parts) >= 2 and parts[0] == "sessions":
+                self.handle_session(method, client_id, parts[1], parts[2:], body)
+            else:
+                self.send_json(404, {"error": f"No route for {method} {url.path}"})
+        except ClientLimitError as e:
+            self.send_json(429, {"error": str(e)})
+        except BadRequestError as e:
+            self.send_json(400, {"error": str(e)})
+        except KeyError as e:
+            self.send_json(404, {"error": f"Unknown session {e}"})
+        except Exception as e:
+            logging.error("Error handling %s %s: ", method, url.path, exc_info=e)
+            self.send_json(500, {"error": str(e)})
+
+    def handle_session(self, method, client_id, session_id, action, body):
+        if method == "POST" and action == ["audio"]:
+            session = self.app.get_session(client_id, session_id)
+            session.append(body)
+            self.send_json(200, {"partial": session.partial_text, "duration": session.audio_buffer.duration})
+        elif method == "GET" and not action:
+            session = self.app.get_session(client_id, session_id)
+            self.send_json(200, {"partial": session.partial_text, "duration": session.audio_buffer.duration})
+        elif method == "POST" and action == ["finish"]:
+            self.send_json(200, self.app.finish_session(client_id, session_id))
+        elif method == "DELETE" and not action:
+            self.app.close_session(client_id, session_id)
+            self.send_json(200, {"closed": session_id})
+        else:
+            self.send_json(404, {"error": f"No route for {method} {self.path}"})
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logging.debug("%s - %s", self.address_string(), format % args)
@@ -0,0 +1,284 @@
+import concurrent.futures
+import multiprocessing
+import threading
+import logging
+import time
+from AudioFileReader import AudioFileReader, transcribe_windows
+from CpuTuning import apply_cpu_tuning
+
+# Registry of a worker process, created by init_worker
+worker_registry = None
+
+
+def init_worker(config_path, model_name, backend_name=None, backend_options=None, cpu_tuning=None):
+    # Runs once in every worker process, the model then stays resident there
+    global worker_registry
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s')
+
+    # Before torch is imported, so thread settings and pinning apply to all of its threads
+    apply_cpu_tuning(cpu_tuning)
+    from ModelRegistry import ModelRegistry
+
+    worker_registry = ModelRegistry(config_path)
+    if model_name is not None:
+        worker_registry.update_model(model_name, backend_name, backend_options)
+    else:
+        worker_registry.get_model()
+
+
+def warm_up_worker():
+    # Nothing to do, running it makes the pool start the process and load the model
+    return True
+
+
+def transcribe_in_worker(audio_input, options, model_name=None, chunking=None):
+    model = worker_registry.get_named_model(model_name) if model_name else worker_registry.get_model()
+    return run_transcription(model, audio_input, options, chunking)
+
+
+def run_transcription(model, audio_input, options, chunking=None):
+    # chunking = (window_seconds, overlap_seconds) memory-maps WAV/PCM files and decodes them window by window
+    start_time = time.perf_counter()
+    reader = None
+    if chunking is not None and AudioFileReader.supports(audio_input):
+        try:
+            reader = AudioFileReader(audio_input)
+        except ValueError as e:
+            # e.g. 24-bit or µ-law WAVs, the model decodes those through ffmpeg
+            logging.warning(f"Decoding {audio_input} whole: {e}")
+    if reader is not None:
+        with reader:
+            result = transcribe_windows(lambda audio: model.transcribe(audio, **options), reader, *chunking)
+    else:
+        result = model.transcribe(audio_input, **options)
+    # Only keep what callers use, so results stay cheap to send between processes
+    return {
+        "text": result["text"],
+        "segments": [{"start": segment["start"], "end": segment["end"], "text": segment["text"]}
+                     for segment in result.get("segments", [])],
+        "language": result.get("language"),
+        "model": getattr(model, "model_name", None),
+        "decode_seconds": time.perf_counter() - start_time,
+    }
+
+
+class TranscriptionService:
+    def __init__(self, model_registry, workers=0, cache=None, cpu_tuning=None):
+        # workers == 0 decodes on one background thread in this process,
+        # workers >= 1 keeps that many worker processes with their own copy of the model
+        self.model_registry = model_registry
+        self.workers = workers
+
+        # Thread counts, priority and core pinning for whatever runs the model
+        self.cpu_tuning = cpu_tuning
+
+        # Optional TranscriptionCache, a hit skips decoding entirely
+        self.cache = cache
+
+        self.pending = 0
+        self.pending_lock = threading.Lock()
+        with model_registry.lock:
+            backend_name, backend_options = model_registry.resolve_backend(None, None)
+            model_name = model_registry.resolve_model_name()
+        self.executor, self.warm_ups = self.create_executor(model_name, backend_name, backend_options)
+        # Model key of the running worker pool, a switch to the same key keeps the pool
+        self.executor_key = model_registry.model_key(model_name, backend_name, backend_options)
+
+        # Worker pool started ahead of a model switch, as (key, executor, warm ups)
+        self.preloaded = None
+        self.preload_lock = threading.Lock()
+
+    def create_executor(self, model_name, backend_name=None, backend_options=None):
+        # Returns the executor and the futures that finish once its workers have loaded the model
+        if self.workers <= 0:
+            # Priority and pinning only apply to the decode thread here, the UI and hotkey threads keep theirs
+            return concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcription",
+                                                         initializer=apply_cpu_tuning,
+                                                         initargs=(self.cpu_tuning, True)), []
+
+        logging.info("Starting %d transcription worker process(es)...", self.workers)
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,
+                                                          mp_context=multiprocessing.get_context("spawn"),
+                                                          initializer=init_worker,
+                                                          initargs=(self.model_registry.config_path, model_name,
+                                                                    backend_name, backend_options, self.cpu_tuning))
+        # Processes are started on demand, start them now so the first recording does not wait
+        warm_ups = [executor.submit(warm_up_worker) for _ in range(self.workers)]
+        return executor, warm_ups
+
+    def warm_up(self):
+        # Blocks until the model is loaded, in this process or in every worker.
+        # Jobs submitted meanwhile wait in the queue.
+        if self.workers <= 0:
+            # On the decode thread, so its CPU tuning is in place before torch is imported
+            self.executor.submit(self.model_registry.get_model).result()
+        else:
+            for warm_up in self.warm_ups:
+                warm_up.result()
+
+    def submit(self, audio_input, model_name=None, use_cache=True, chunking=None, **options):
+        # Jobs queue up behind each other, the returned future resolves to the result dict.
+        # model_name picks a model other than the current one, e.g. the draft model.
+        cache_options = dict(options, chunking=chunking) if chunking is not None else options
+        cache_key = self.get_cache_key(audio_input, model_name, cache_options) if use_cache else None
+        if cache_key is not None:
+            cached_result = self.cache.get(cache_key)
+            if cached_result is not None:
+                logging.info("Transcription cache hit, skipping decode.")
+                future = concurrent.futures.Future()
+                future.set_result(cached_result)
+                return future
+
+        with self.pending_lock:
+            self.pending += 1
+
+        if self.workers <= 0:
+            future = self.executor.submit(self.transcribe_in_process, audio_input, options, model_name, chunking)
+        else:
+            future = self.executor.submit(transcribe_in_worker, audio_input, options, model_name, chunking)
+        future.add_done_callback(self.job_done)
+        if cache_key is not None:
+            future.add_done_callback(lambda future: self.store_result(cache_key, future))
+        return future
+
+    def transcribe(self, audio_input, model_name=None, use_cache=True, **options):
+        # Blocking helper for callers that already run off the UI thread
+        return self.submit(audio_input, model_name, use_cache, **options).result()
+
+    def get_cache_key(self, audio_input, model_name, options):
+        if self.cache is None:
+            return None
+        with self.model_registry.lock:
+            backend_name, backend_options = self.model_registry.resolve_backend(None, None)
+            model_name = model_name or self.model_registry.resolve_model_name()
+        try:
+            return self.cache.make_key(audio_input, model_name, backend_name, backend_options, options)
+        except OSError as e:
+            logging.error(f"Error hashing audio for the transcription cache: {e}")
+            return None
+
+    def store_result(self, cache_key, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        try:
+            self.cache.put(cache_key, future.result())
+        except Exception as e:
+            logging.error(f"Error writing to the transcription cache: {e}")
+
+    def transcribe_in_process(self, audio_input, options, model_name=None, chunking=None):
+        if model_name:
+            model = self.model_registry.get_named_model(model_name)
+        else:
+            model = self.model_registry.get_model()
+        return run_transcription(model, audio_input, options, chunking)
+
+    def job_done(self, future):
+        with self.pending_lock:
+            self.pending -= 1
+
+    @property
+    def queue_depth(self):
+        with self.pending_lock:
+            return self.pending
+
+    def update_model(self, new_model_name, backend_name=None, backend_options=None):
+        if self.workers <= 0:
+            self.model_registry.update_model(new_model_name, backend_name, backend_options)
+            return
+
+        # Worker processes load the new model on start, queued jobs finish on the old pool
+        key = self.get_model_key(new_model_name, backend_name, backend_options)
+        if key != self.executor_key:
+            executor, _ = self.create_executor(new_model_name, backend_name, backend_options)
+            self.swap_executor(executor, key)
+        self.model_registry.configure(new_model_name, backend_name, backend_options)
+
+    def preload(self, model_name, backend_name=None, backend_options=None, callback=None):
+        if self.workers <= 0:
+            self.model_registry.preload(model_name, backend_name, backend_options, callback)
+            return
+
+        # Start a second pool on the new model, switch_model picks it up
+        preloaded = self.preload_executor(model_name, backend_name, backend_options)
+        if preloaded is None:
+            if callback is not None:
+                callback(model_name, None)
+            return
+        threading.Thread(target=self.wait_for_workers, args=(preloaded, model_name, callback), daemon=True).start()
+
+    def get_model_key(self, model_name, backend_name, backend_options):
+        with self.model_registry.lock:
+            backend_name, backend_options = self.model_registry.resolve_backend(backend_name, backend_options)
+            return self.model_registry.model_key(model_name, backend_name, backend_options)
+
+    def preload_executor(self, model_name, backend_name, backend_options):
+        # None when the running pool already has this model
+        with self.model_registry.lock:
+            backend_name, backend_options = self.model_registry.resolve_backend(backend_name, backend_options)
+        key = self.model_registry.model_key(model_name, backend_name, backend_options)
+
+        with self.preload_lock:
+            if key == self.executor_key:
+                # Also drops a pool preloaded for a model the user switched away from again
+                if self.preloaded is not None:
+                    self.preloaded[1].shutdown(wait=False, cancel_futures=True)
+                    self.preloaded = None
+                return None
+            if self.preloaded is not None and self.preloaded[0] == key:
+                return self.preloaded
+            if self.preloaded is not None:
+                self.preloaded[1].shutdown(wait=False, cancel_futures=True)
+            executor, warm_ups = self.create_executor(model_name, backend_name, backend_options)
+            self.preloaded = (key, executor, warm_ups)
+            return self.preloaded
+
+    def wait_for_workers(self, preloaded, model_name, callback):
+        error = None
+        try:
+            for warm_up in preloaded[2]:
+                warm_up.result()
+        except Exception as e:
+            logging.error(f"Error starting workers for model '{model_name}': {e}")
+            error = e
+        if callback is not None:
+            callback(model_name, error)
+        return error
+
+    def switch_model(self, model_name, backend_name=None, backend_options=None, callback=None):
+        # Load in the background and swap once ready, the current model keeps serving meanwhile
+        if self.workers <= 0:
+            self.model_registry.switch_model(model_name, backend_name, backend_options, callback)
+            return
+
+        def run():
+            preloaded = self.preload_executor(model_name, backend_name, backend_options)
+            if preloaded is None:
+                # Same model as the running pool, e.g. only a shortcut changed
+                self.model_registry.configure(model_name, backend_name, backend_options)
+                error = None
+            else:
+                error = self.wait_for_workers(preloaded, model_name, None)
+                with self.preload_lock:
+                    if error is None and self.preloaded is preloaded:
+                        self.preloaded = None
+                        self.swap_executor(preloaded[1], preloaded[0])
+                        self.model_registry.configure(model_name, backend_name, backend_options)
+            if callback is not None:
+                callback(model_name, error)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def swap_executor(self, executor, key):
+        old_executor = self.executor
+        self.executor = executor
+        self.executor_key = key
+        old_executor.shutdown(wait=False)
+
+    def shutdown(self):
+        with self.preload_lock:
+            if self.preloaded is not None:
+                self.preloaded[1].shutdown(wait=False, cancel_futures=True)
+                self.preloaded = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.cache is not None:
+            self.cache.close()
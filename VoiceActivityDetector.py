@@ -0,0 +1,78 @@
+import logging
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+
+class VoiceActivityDetector:
+    def __init__(self, sample_rate=16000, backend="energy", frame_duration=0.03, padding=0.2,
+                 energy_ratio=3.0, min_energy=200.0, aggressiveness=2):
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_duration)
+
+        # Speech is padded on both sides, so silences longer than twice this are cut
+        self.padding_frames = max(int(padding / frame_duration), 0)
+
+        # Energy detector: frames louder than the noise floor times energy_ratio are speech
+        self.energy_ratio = energy_ratio
+        self.min_energy = min_energy
+
+        self.backend = backend
+        self.vad = None
+        if backend == "webrtc":
+            if webrtcvad is None:
+                logging.error("webrtcvad is not installed, falling back to the energy detector.")
+                self.backend = "energy"
+            else:
+                self.vad = webrtcvad.Vad(aggressiveness)
+
+    def trim(self, audio_samples):
+        # Returns the int16 samples with silence removed, and how much was removed
+        frame_count = len(audio_samples) // self.frame_size
+        if frame_count == 0:
+            return audio_samples[:0], self.make_stats(len(audio_samples), 0)
+
+        frames = audio_samples[:frame_count * self.frame_size].reshape(frame_count, self.frame_size)
+        if self.backend == "webrtc":
+            speech = np.array([self.vad.is_speech(frame.tobytes(), self.sample_rate) for frame in frames])
+        else:
+            speech = self.detect_energy(frames)
+
+        keep = self.pad_speech(speech)
+        if not keep.any():
+            return audio_samples[:0], self.make_stats(len(audio_samples), 0)
+
+        kept_samples = np.repeat(keep, self.frame_size)
+        trimmed = audio_samples[:frame_count * self.frame_size][kept_samples]
+        return trimmed, self.make_stats(len(audio_samples), len(trimmed))
+
+    def detect_energy(self, frames):
+        rms = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+        noise_floor = np.percentile(rms, 10)
+        if noise_floor > self.min_energy:
+            # No quiet frames in the clip, the floor is speech, only cut what is below min_energy
+            return rms > self.min_energy
+        threshold = max(noise_floor * self.energy_ratio, self.min_energy)
+        return rms > threshold
+
+    def pad_speech(self, speech):
+        # Grow every speech frame by padding_frames on each side
+        if self.padding_frames == 0:
+            return speech
+        kernel = np.ones(2 * self.padding_frames + 1)
+        # 'same' returns the longer of the two, which is the kernel for clips shorter than it
+        padded = np.convolve(speech.astype(np.float32), kernel, mode='full')
+        return padded[self.padding_frames:self.padding_frames + len(speech)] > 0
+
+    def make_stats(self, original_samples, kept_samples):
+        original = original_samples / self.sample_rate
+        kept = kept_samples / self.sample_rate
+        return {
+            "original_seconds": original,
+            "kept_seconds": kept,
+            "removed_seconds": original - kept,
+            "removed_ratio": (original - kept) / original if original else 0.0,
+        }
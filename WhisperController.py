@@ -1,8 +1,8 @@
 from pynput import mouse, keyboard
 import threading
-import pyperclip
 import logging
-from WhisperRecorder import WhisperRecorder
+from InputScheduler import InputScheduler
+from HotkeyDispatcher import HotkeyDispatcher
 from WhisperUI import WhisperUI
 import time
 import sys
@@ -18,15 +18,24 @@ class WhisperController:
         self.transcription_lock = threading.Lock()
         self.keyboard_controller = keyboard.Controller()
 
-        # Initialize Recorder/Transcription
-        self.recorder = WhisperRecorder(self.whisper_ui, self.keyboard_controller)
+        # Chat keep-alive and paste macros run on this one thread
+        self.input_scheduler = InputScheduler(self.keyboard_controller)
+
+        # Recorder/Transcription, created in the background by load_recorder
+        self.recorder = None
+
+        # The paste macro in progress, if any
+        self.macro_future = None
+
+        # Shortcut table, its actions run on the dispatcher's worker thread
+        self.hotkey_dispatcher = HotkeyDispatcher()
         
         # Start the mouse and keyboard listeners
         self.mouse_listener = mouse.Listener(on_click=self.on_click)
         self.mouse_listener.start()
 
-        # Keyboard listeners for closing
-        self.keyboard_listener = keyboard.Listener(on_press=self.on_press)
+        # Keyboard listeners for shortcuts and closing
+        self.keyboard_listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
         self.keyboard_listener.start()
 
         # Config key detection
@@ -35,15 +44,35 @@ class WhisperController:
 
         # Initialize default values for shortcuts
         self.record_shortcut = {"type": "mouse", "key": "Button.x2"}
-        self.paste_shortcut = {"type": "keyboard", "key": "v"}
+        self.paste_shortcut = {"type": "mouse", "key": "Button.x1"}
 
         # Load the configuration
         self.load_configuration()
 
+        # Audio libraries and the model load in the background, the window and shortcuts are already up
+        threading.Thread(target=self.load_recorder, name="startup", daemon=True).start()
 
+    def load_recorder(self):
+        try:
+            self.whisper_ui.set_loading_status("Starting audio...")
+            # Deferred, pulls in pyaudio and numpy
+            from WhisperRecorder import WhisperRecorder
+            recorder = WhisperRecorder(self.whisper_ui, self.input_scheduler)
+            recorder.on_refined = self.on_transcription_refined
+            self.recorder = recorder
 
+            # Recording works from here on, clips wait in the queue until the model is loaded
+            self.whisper_ui.set_loading_status(f"Loading model {recorder.model_name}... (recording already works)")
+            recorder.load_model()
+            self.whisper_ui.set_loading_status("", done=True)
+        except Exception as e:
+            logging.error("Error during startup: ", exc_info=e)
+            self.whisper_ui.set_loading_status(f"Startup failed: {e}", failed=True)
 
     def start_recording(self):
+        if self.recorder is None:
+            logging.info("Audio is still starting, ignoring record shortcut.")
+            return
         if not self.recorder.is_recording:
         # Only start recording if it's not already happening
             with self.transcription_lock:
@@ -57,83 +86,97 @@ class WhisperController:
                     logging.error("Error starting recording: ", exc_info=e)
 
     def stop_recording_and_transcribe(self):
-        if self.recorder.is_recording:
+        if self.recorder is not None and self.recorder.is_recording:
             # Only stop recording if it's currently active
             with self.transcription_lock:
                 try:
-                    # This will now also fetch the transcription
-                    self.transcribed_text = self.recorder.toggle_recording()
-                    logging.info("Transcribed text: %s", self.transcribed_text)
+                    # Queue the recording, the text arrives in on_transcription_done
+                    transcription_future = self.recorder.toggle_recording()
+                    transcription_future.add_done_callback(self.on_transcription_done)
                     print("Recording stopped.")
                 except Exception as e:
                     logging.error("Error stopping recording: ", exc_info=e)
 
+    def on_transcription_done(self, transcription_future):
+        try:
+            self.transcribed_text = transcription_future.result()
+            logging.info("Transcribed text: %s", self.transcribed_text)
+        except Exception as e:
+            logging.error("Error transcribing recording: ", exc_info=e)
+
+    def on_transcription_refined(self, text):
+        self.transcribed_text = text
+
     def perform_macro(self):
         # Retrieve text from the transcription box
-        text = self.whisper_ui.transcription_box.get("1.0", "end-1c").strip()
+        text = self.whisper_ui.get_transcription_text().strip()
+
+        # Finished text can be pasted while later recordings are still decoding, partial text cannot
+        if self.recorder is None or self.recorder.showing_partial:
+            logging.info("Transcription still in progress...")
+            return
+
+        if self.macro_future is not None and not self.macro_future.done():
+            # Older pynput does not flag injected keys, the macro's own Ctrl+V must not start it again
+            logging.info("Paste macro already running.")
+            return
 
         if self.transcription_lock.acquire(blocking=False):
+            self.recorder.mark_pasted()
+            timings = self.recorder.latency_metrics.last_utterance()
+            macro_start = time.perf_counter()
             try:
-                if not self.whisper_ui.chat_mode.get():
+                scheduler = self.input_scheduler
+                if not self.whisper_ui.is_chat_mode():
                     logging.info("Chat Mode paste")
-                    # Tap the 't' key first
-                    self.keyboard_controller.tap(keyboard.Key.esc)
-                    self.keyboard_controller.tap(keyboard.KeyCode.from_char('t'))
-                    self.keyboard_controller.press(keyboard.Key.backspace)
-                    self.keyboard_controller.press(keyboard.Key.backspace)
-                    self.keyboard_controller.press(keyboard.Key.backspace)
-                    time.sleep(0.1)  # Tiny pause
-                    pyperclip.copy(text)
-                    with self.keyboard_controller.pressed(keyboard.Key.ctrl):
-                        self.keyboard_controller.press('v')
-                        self.keyboard_controller.release('v')
+                    # Open the chat with 't' and clear what the keep-alive left behind
+                    steps = [(0.0, lambda: scheduler.tap(keyboard.Key.esc)),
+                             (0.0, lambda: scheduler.tap(keyboard.KeyCode.from_char('t')))]
+                    steps += [(0.0, lambda: scheduler.tap(keyboard.Key.backspace))] * 3
+                    steps.append((scheduler.timing["paste_delay"], lambda: scheduler.paste(text)))
                 else:
-                    # Non-chat mode
-                    
-                    # Copy text to clipboard
-                    pyperclip.copy(text)
-
-                    # Paste using Ctrl+V
-                    with self.keyboard_controller.pressed(keyboard.Key.ctrl):
-                        self.keyboard_controller.press('v')
-                        self.keyboard_controller.release('v')
-
-                    time.sleep(0.1)  # Tiny pause
-                    # Press Enter
-                    self.keyboard_controller.tap(keyboard.Key.enter)
+                    # Non-chat mode: paste, then press Enter
+                    steps = [(0.0, lambda: scheduler.paste(text)),
+                             (scheduler.timing["enter_delay"], lambda: scheduler.tap(keyboard.Key.enter))]
+                macro_future = scheduler.run_sequence(steps, group="paste")
+                self.macro_future = macro_future
+                if timings is not None:
+                    macro_future.add_done_callback(lambda future: self.record_macro_timings(timings, macro_start))
             finally:
                 self.transcription_lock.release()
         else:
             logging.info("Transcription still in progress...")
 
+    def record_macro_timings(self, timings, macro_start):
+        timings.record("paste_macro", time.perf_counter() - macro_start)
+        timings.mark_since_release("release_to_paste")
+
     
-    def on_click(self, x, y, button, pressed):
+    def on_click(self, x, y, button, pressed, injected=False):
         if self.is_listening_for_shortcut and self.shortcut_detection_mode:
-            if pressed:
+            if pressed and not injected:
                 self.set_shortcut(button, self.shortcut_detection_mode)
             return  # Skip the normal logic when in shortcut detection mode
-        if button == mouse.Button.x2:
-            if pressed:
-                threading.Thread(target=self.start_recording).start()
-            else:
-                threading.Thread(target=self.stop_recording_and_transcribe).start()
-        elif button == mouse.Button.x1 and not pressed and self.transcribed_text:
-            logging.info("Running Pasting macro text: %s", self.transcribed_text)
-            self.perform_macro()
-            
+        self.hotkey_dispatcher.on_click(x, y, button, pressed, injected)
     
-    def on_press(self, key):
+    def on_press(self, key, injected=False):
+        if injected:
+            # Our own keystrokes, e.g. the paste macro
+            return
         if key == keyboard.Key.f3:
             print("Exiting...")
-            # Initiate the UI close
-            self.whisper_ui.root.destroy()
+            # Initiate the UI close on the Tk thread
+            self.whisper_ui.run_on_ui_thread(self.whisper_ui.root.destroy)
             return False  # This will stop the listener
         if self.is_listening_for_shortcut and self.shortcut_detection_mode:
             self.set_shortcut(key, self.shortcut_detection_mode)
             self.stop_listening_for_shortcut()  # Stop listening after capturing the shortcut
             return  # Skip the normal logic when in shortcut detection mode
         else:
-            self.trigger_recording_if_shortcut_matches(key)
+            self.hotkey_dispatcher.on_press(key)
+
+    def on_release(self, key, injected=False):
+        self.hotkey_dispatcher.on_release(key, injected)
 
     def set_shortcut(self, input, mode):
         # Determine the type of the input
@@ -151,14 +194,17 @@ class WhisperController:
         # Update the UI and save only the key
         shortcut_info = {"type": input_type, "key": shortcut_key}
         if mode == 'record':
-            self.whisper_ui.set_record_shortcut(shortcut_info)
+            self.whisper_ui.run_on_ui_thread(self.whisper_ui.set_record_shortcut, shortcut_info)
         elif mode == 'paste':
-            self.whisper_ui.set_paste_shortcut(shortcut_info)
+            self.whisper_ui.run_on_ui_thread(self.whisper_ui.set_paste_shortcut, shortcut_info)
 
     def close_application(self):
         # Add cleanup code here
         print("Application closing...")
-        self.recorder.terminate()  # Assuming terminate is a method to clean up the recorder
+        if self.recorder is not None:
+            self.recorder.terminate()  # Assuming terminate is a method to clean up the recorder
+        self.input_scheduler.stop()
+        self.hotkey_dispatcher.stop()
         self.mouse_listener.stop()  # Assuming you have a mouse listener to stop
         self.keyboard_listener.stop()  # Assuming you have a keyboard listener to stop
         self.whisper_ui.root.destroy()  # This will destroy the UI
@@ -169,7 +215,10 @@ class WhisperController:
             self.whisper_ui.start()
             logging.info("Setup Complete.")
         finally:
-            self.recorder.terminate()
+            if self.recorder is not None:
+                self.recorder.terminate()
+            self.input_scheduler.stop()
+            self.hotkey_dispatcher.stop()
             self.mouse_listener.stop()
             self.keyboard_listener.stop()
 
@@ -178,12 +227,15 @@ class WhisperController:
             with open('config.json', 'r') as config_file:
                 config = json.load(config_file)
                 self.record_shortcut = config.get('record_shortcut', {"type": "mouse", "key": "Button.x2"})
-                self.paste_shortcut = config.get('paste_shortcut', {"type": "keyboard", "key": "v"})
+                self.paste_shortcut = config.get('paste_shortcut', {"type": "mouse", "key": "Button.x1"})
+                self.input_scheduler.configure(config)
+                self.bind_shortcuts()
         except (FileNotFoundError, json.JSONDecodeError) as e:
             logging.error(f"Error loading configuration: {e}")
             # Set default values if configuration loading fails
             self.record_shortcut = {"type": "mouse", "key": "Button.x2"}
-            self.paste_shortcut = {"type": "keyboard", "key": "v"}
+            self.paste_shortcut = {"type": "mouse", "key": "Button.x1"}
+            self.bind_shortcuts()
     
     def start_listening_for_shortcut(self):
         self.is_listening_for_shortcut = True
@@ -191,26 +243,64 @@ class WhisperController:
     def stop_listening_for_shortcut(self):
         self.is_listening_for_shortcut = False
     
-    def trigger_recording_if_shortcut_matches(self, key):
-        # Load or keep track of the configured record shortcut
-        record_shortcut = self.record_shortcut
-        if record_shortcut['type'] == 'keyboard' and record_shortcut['key'] == str(key):
-            if self.recorder.is_recording:
-                # Stop recording if it's currently active
-                self.stop_recording_and_transcribe()
-            else:
-                # Start recording if it's not currently active
-                self.start_recording()
+    def toggle_recording(self):
+        if self.recorder is not None and self.recorder.is_recording:
+            # Stop recording if it's currently active
+            self.stop_recording_and_transcribe()
+        else:
+            # Start recording if it's not currently active
+            self.start_recording()
+
+    def paste_transcription(self):
+        if self.transcribed_text:
+            logging.info("Running Pasting macro text: %s", self.transcribed_text)
+            self.perform_macro()
+
+    def bind_shortcuts(self):
+        # A mouse button records while held, a key toggles recording.
+        # Pasting runs when the mouse button is released or the key is pressed.
+        if self.record_shortcut.get('type') == 'mouse':
+            record_binding = (self.record_shortcut, self.start_recording, self.stop_recording_and_transcribe)
+        else:
+            record_binding = (self.record_shortcut, self.toggle_recording, None)
+        if self.paste_shortcut.get('type') == 'mouse':
+            paste_binding = (self.paste_shortcut, None, self.paste_transcription)
+        else:
+            paste_binding = (self.paste_shortcut, self.paste_transcription, None)
+        self.hotkey_dispatcher.set_bindings([record_binding, paste_binding])
 
     def update_shortcuts_from_config(self):
         try:
             with open('config.json', 'r') as config_file:
                 config = json.load(config_file)
                 self.record_shortcut = config.get('record_shortcut', {"type": "mouse", "key": "Button.x2"})
-                self.paste_shortcut = config.get('paste_shortcut', {"type": "keyboard", "key": "v"})
+                self.paste_shortcut = config.get('paste_shortcut', {"type": "mouse", "key": "Button.x1"})
+                self.input_scheduler.configure(config)
+                self.bind_shortcuts()
         except (FileNotFoundError, json.JSONDecodeError) as e:
             logging.error(f"Error updating configuration: {e}")
 
     def update_model_in_recorder(self):
-        selected_model = self.whisper_ui.model_combobox.get()
-        self.recorder.update_model(selected_model)
\ No newline at end of file
+        model_name, backend_name, backend_options = self.whisper_ui.get_model_settings()
+        self.switch_model(model_name, backend_name, backend_options)
+
+    def preload_model(self, model_name, backend_name, backend_options):
+        # Start loading as soon as a model is picked, before Save is pressed
+        if self.recorder is None:
+            return  # The startup load picks up the saved model
+        self.whisper_ui.set_model_status(f"Loading {model_name} in the background...")
+        self.recorder.preload_model(model_name, backend_name, backend_options, callback=self.on_model_preloaded)
+
+    def switch_model(self, model_name, backend_name, backend_options):
+        if self.recorder is None:
+            return
+        self.whisper_ui.set_model_status(f"Switching to {model_name}...")
+        self.recorder.switch_model(model_name, backend_name, backend_options, callback=self.on_model_switched)
+
+    def on_model_preloaded(self, model_name, error):
+        status = f"Failed to load {model_name}: {error}" if error else f"{model_name} is ready, press Save to use it"
+        self.whisper_ui.run_on_ui_thread(self.whisper_ui.set_model_status, status)
+
+    def on_model_switched(self, model_name, error):
+        status = f"Failed to load {model_name}: {error}" if error else f"Using {model_name}"
+        self.whisper_ui.run_on_ui_thread(self.whisper_ui.set_model_status, status)
\ No newline at end of file
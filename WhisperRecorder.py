@@ -1,172 +1,493 @@
+import functools
 import threading
-import wave
 import pyaudio
-import whisper
-import os
 import logging
 import time
 import json
-from pynput import keyboard
+import collections
+import concurrent.futures
+from ModelRegistry import model_registry
+from StreamingTranscriber import StreamingTranscriber
+from AudioBuffer import AudioBuffer, pcm_to_float32
+from VoiceActivityDetector import VoiceActivityDetector
+from TranscriptionService import TranscriptionService
+from LatencyMetrics import LatencyMetrics
+from TranscriptionCache import TranscriptionCache
+from DecodeSettings import DecodeSettings
+from RecordingHistory import RecordingHistory
+from ModelSelectionPolicy import ModelSelectionPolicy
 
 class WhisperRecorder:
-    def __init__(self, ui, keyboard_controller, model_name="tiny"):
+    def __init__(self, ui, input_scheduler, model_registry=model_registry):
         # Transcription Config
         self.ui = ui
-        self.keyboard_controller = keyboard_controller
+        self.input_scheduler = input_scheduler
         self.is_recording = False
         self.stream = None
-        self.audio_frames = []
-        self.model = whisper.load_model(model_name)
         self.audio = pyaudio.PyAudio()
         self.temp_wav_file = "recording.wav"
 
         # Audio recording config
-        self.chunk_size = 4096
+        self.chunk_size = 1024
         self.audio_format = pyaudio.paInt16
         self.channels = 1
         self.sample_rate = 16000
 
-        # Recording history
-        self.recordings_history = []
-        self.max_history_size = 3
+        # Recording history, written in the background with retention by count, age and size
         self.recordings_folder = "recordings"
-        self.ensure_recordings_folder()
+        self.history_config = {"max_count": 3, "max_age_days": None, "max_mb": None, "format": "flac"}
 
-        # Model config
-        self.model_name = model_name
-        self.model = whisper.load_model(self.model_name)
+        # Transcribe straight from memory instead of through a WAV file
+        self.in_memory_transcription = True
 
-        self.load_model_from_config()
+        # Decode rolling windows while the button is held
+        self.streaming_transcription = False
+        self.streaming_interval = 1.0
+        self.streaming_transcriber = None
 
-        logging.info("Recorder finished loading, close loading box.")
-        self.ui.create_main_ui_window()
-        self.ui.close_loading_screen()
+        # Captured audio, preallocated and capped at max_recording_seconds
+        self.max_recording_seconds = 300.0
+
+        # Audio kept from just before the button press
+        self.preroll_seconds = 0.5
+
+        # Silence trimming before decoding
+        self.vad_config = {"enabled": True, "backend": "energy"}
+        self.last_vad_stats = None
+
+        # 0 decodes on a background thread, more starts worker processes
+        self.transcription_workers = 0
+        self.pending_transcriptions = 0
+        self.pending_lock = threading.Lock()
+        # The transcription box shows partial text of a recording that is still decoding
+        self.showing_partial = False
+
+        # Results cached on disk by audio fingerprint, model and options
+        self.cache_config = {"enabled": True, "path": "cache/transcriptions.sqlite3", "max_mb": 64}
+
+        # Two-tier decoding: a small draft model answers first, the configured model refines
+        self.draft_model = None
+        self.latest_draft = None
+        self.on_refined = None
+
+        # Threads, priority and core pinning for inference
+        self.cpu_tuning = None
+
+        # Per-utterance model choice from clip length, queue depth and measured speed, off by default
+        self.policy_config = {"enabled": False}
+
+        # Task, language and decode options from the active profile
+        self.decode_settings = DecodeSettings()
+        # Final job of the previous clip, the next one waits for it when its options depend on the result
+        self.context_job = None
+
+        # Per-utterance timings from button release to pasted text
+        self.latency_metrics = LatencyMetrics()
+        self.load_configuration()
+        self.recording_history = RecordingHistory(self.recordings_folder,
+                                                  max_count=self.history_config.get('max_count', 3),
+                                                  max_age_days=self.history_config.get('max_age_days'),
+                                                  max_mb=self.history_config.get('max_mb'),
+                                                  audio_format=self.history_config.get('format', 'flac'),
+                                                  sample_rate=self.sample_rate)
+        self.voice_activity_detector = self.create_voice_activity_detector()
+        self.model_policy = None
+        # append runs in the audio callback, growing there would copy megabytes mid-recording
+        self.audio_buffer = AudioBuffer(self.sample_rate, self.max_recording_seconds, preallocate=True)
+        preroll_chunks = max(int(self.preroll_seconds * self.sample_rate / self.chunk_size), 1)
+        self.preroll_buffer = collections.deque(maxlen=preroll_chunks)
+        self.capture_lock = threading.Lock()
+
+        # Keep the input stream open so recording starts instantly
+        self.open_stream()
+
+        # Model config, loaded once through the shared registry by load_model
+        self.model_registry = model_registry
+        self.model_ready = threading.Event()
+        self.transcription_service = TranscriptionService(self.model_registry, self.transcription_workers,
+                                                          cache=self.create_transcription_cache(),
+                                                          cpu_tuning=self.cpu_tuning)
+        self.model_policy = self.create_model_policy()
+        self.streaming_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="streaming")
+        logging.info("Recorder ready, the model loads next.")
+
+    def load_model(self):
+        # Blocking, run it off the UI thread. Recordings made meanwhile are queued until it is done.
+        self.transcription_service.warm_up()
+        self.model_ready.set()
         logging.info("Whisper model loaded")
 
+    def open_stream(self):
+        logging.info('Opening input stream.')
+        self.stream = self.audio.open(format=self.audio_format, channels=self.channels, rate=self.sample_rate,
+                                      input=True, frames_per_buffer=self.chunk_size,
+                                      stream_callback=self.audio_callback)
+        self.stream.start_stream()
+
+    def close_stream(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+
+    def audio_callback(self, in_data, frame_count, time_info, status):
+        # Runs on PortAudio's audio thread, keep it short
+        with self.capture_lock:
+            if self.is_recording:
+                self.audio_buffer.append(in_data)
+            else:
+                self.preroll_buffer.append(in_data)
+        return (None, pyaudio.paContinue)
+
     def start_recording(self):
         logging.info('Recording started...')
-        self.stream = self.audio.open(format=self.audio_format, channels=self.channels, rate=self.sample_rate, input=True, frames_per_buffer=self.chunk_size)
-        self.is_recording = True
-        self.audio_frames = []
+        if self.stream is None or not self.stream.is_active():
+            # The device went away, reopen it
+            self.close_stream()
+            self.open_stream()
 
-        # Start a separate thread for simulating keystrokes
-        self.keystroke_thread = threading.Thread(target=self.simulate_keystrokes)
-        self.keystroke_thread.start()
+        with self.capture_lock:
+            # Begin with the audio captured just before the button press
+            self.audio_buffer.reset()
+            for data in self.preroll_buffer:
+                self.audio_buffer.append(data)
+            self.preroll_buffer.clear()
+            self.is_recording = True
 
-        while self.is_recording:
-            data = self.stream.read(self.chunk_size)
-            self.audio_frames.append(data)
+        if self.ui.is_chat_mode():
+            # Keeps the game chat open until the capture stops
+            self.input_scheduler.start_keep_alive()
+
+        if self.streaming_transcription:
+            # One set of options for every window of this recording
+            transcribe = functools.partial(self.transcribe_audio, options=self.decode_settings.get_options())
+            self.streaming_transcriber = StreamingTranscriber(transcribe, self.get_captured_audio,
+                                                              on_partial=self.show_partial,
+                                                              sample_rate=self.sample_rate,
+                                                              interval=self.streaming_interval)
+            self.streaming_transcriber.start()
+
+    def stop_capture(self):
+        with self.capture_lock:
+            self.is_recording = False
+        self.input_scheduler.stop_keep_alive()
 
     def stop_recording_and_transcribe(self):
         logging.info('Halting Recording...')
+        timings = self.latency_metrics.start_utterance()
         self.ui.change_state_indicator("yellow", text="Recording Ending")
         
-        # Close the stream
-        logging.info('Close Stream.')
-        self.stream.stop_stream()
-        self.stream.close()
+        # Stop capturing, the stream itself stays open for the next recording
+        logging.info('Stop capture.')
+        with timings.span("stop_capture"):
+            self.stop_capture()
         self.ui.change_state_indicator("yellow", text="Recording Complete")
         
         # Open/save the audio file
         logging.info('Open/save file.')
         self.ui.change_state_indicator("Orange", text="Preparing Audio...")
+        with timings.span("buffer_view"):
+            audio_samples = self.audio_buffer.view()
 
-        # Generate a unique file name for this recording
-        unique_file_name = self.get_unique_file_name()
-        recording_file_name = self.get_recording_file_path(unique_file_name)
-        wavefile = wave.open(recording_file_name, 'wb')
-        wavefile.setnchannels(self.channels)
-        wavefile.setsampwidth(self.audio.get_sample_size(self.audio_format))
-        wavefile.setframerate(self.sample_rate)
-        wavefile.writeframes(b''.join(self.audio_frames))
-        wavefile.close()
-        self.ui.change_state_indicator("Orange", text="Audio Prepared...")
+        streaming_transcriber = self.streaming_transcriber
+        self.streaming_transcriber = None
+        if streaming_transcriber is not None:
+            # Stop the passes now and hand over this clip's audio, the next recording gets a fresh array
+            streaming_transcriber.stop(lambda start_sample: pcm_to_float32(audio_samples[start_sample:]))
 
-        # Add the new recording to the history
-        self.update_recordings_history(unique_file_name)
+        # The history file is written on the history's own thread
+        recording_name, saved_path = self.recording_history.add(audio_samples, timings)
+        if self.in_memory_transcription:
+            # Hand the PCM straight to the model
+            audio_input = None
+        else:
+            try:
+                audio_input = saved_path.result()  # Use full path here
+            except Exception as e:
+                logging.error(f"Error saving recording {recording_name}, transcribing from memory: {e}")
+                audio_input = None
+
+        # Drop silence before decoding, the history file keeps the full clip
+        speech_samples = audio_samples
+        if self.voice_activity_detector is not None and streaming_transcriber is None:
+            with timings.span("vad"):
+                speech_samples = self.trim_silence(audio_samples)
+            if len(speech_samples) < len(audio_samples):
+                audio_input = None
+        # Streaming decodes only the tail in finish, the whole clip is never needed as float32
+        if audio_input is None and streaming_transcriber is None:
+            with timings.span("audio_convert"):
+                audio_input = pcm_to_float32(speech_samples)
+        self.ui.change_state_indicator("Orange", text="Audio Prepared...")
 
         # Starting Transcription
         logging.info('Starting Transcription')
-        self.ui.change_state_indicator("purple", text="Transcription Starting...")
+        refine_job = None
+        if streaming_transcriber is not None:
+            # Most of the clip is already decoded, only the tail is left
+            self.ui.change_state_indicator("purple", text="Transcription Starting...")
+            job = self.streaming_executor.submit(streaming_transcriber.finish)
+        elif len(speech_samples) == 0:
+            logging.info('No speech detected, skipping transcription.')
+            job = concurrent.futures.Future()
+            job.set_result("")
+        else:
+            queue_depth = self.transcription_service.queue_depth
+            if not self.model_ready.is_set():
+                self.ui.change_state_indicator("purple", text="Queued until the model has loaded...")
+            elif queue_depth:
+                self.ui.change_state_indicator("purple", text=f"Queued behind {queue_depth} recording(s)...")
+            else:
+                self.ui.change_state_indicator("purple", text="Transcription Starting...")
+            audio_seconds = len(speech_samples) / self.sample_rate
+            model_name = None
+            if self.model_policy is not None:
+                model_name = self.model_policy.choose(audio_seconds, queue_depth)
+                if model_name == self.model_name:
+                    model_name = None
 
-        result = self.model.transcribe(recording_file_name, task="translate")  # Use full path here
+            # Handed out now, resolved by the real jobs once they are submitted
+            job = concurrent.futures.Future()
+            if self.draft_model and self.draft_model != (model_name or self.model_name):
+                refine_job = concurrent.futures.Future()
+            previous_job = self.context_job if self.decode_settings.depends_on_previous() else None
+            self.context_job = refine_job or job
+
+            def submit():
+                self.submit_decode(audio_input, model_name, audio_seconds, job, refine_job)
+            if previous_job is None:
+                submit()
+            else:
+                # Back-to-back clips: prompt with the previous clip's text, not whatever was known at release
+                previous_job.add_done_callback(lambda previous_job: submit())
+
+        # Resolves to the text once the queued job is done
+        with self.pending_lock:
+            self.pending_transcriptions += 1
+        transcription_future = concurrent.futures.Future()
+        submit_time = time.perf_counter()
+        job.add_done_callback(lambda job: self.complete_transcription(job, transcription_future, timings, submit_time,
+                                                                      refine_job, recording_name))
+        return transcription_future
+
+    def submit_decode(self, audio_input, model_name, audio_seconds, job, refine_job=None):
+        # Options are resolved here, after the previous clip's result has been observed
+        try:
+            options = self.decode_settings.get_options()
+            if refine_job is not None:
+                # Fast draft first, the accurate model refines the same audio right after
+                draft_job = self.transcription_service.submit(audio_input, model_name=self.draft_model, **options)
+                final_job = self.transcription_service.submit(audio_input, model_name=model_name, **options)
+                draft_job.add_done_callback(lambda draft_job: self.observe_result(draft_job, options, audio_seconds,
+                                                                                  False))
+                # The larger model detects the language more reliably
+                final_job.add_done_callback(lambda final_job: self.observe_result(final_job, options, audio_seconds))
+                draft_job.add_done_callback(lambda draft_job: self.relay_result(draft_job, job))
+                final_job.add_done_callback(lambda final_job: self.relay_result(final_job, refine_job))
+            else:
+                final_job = self.transcription_service.submit(audio_input, model_name=model_name, **options)
+                final_job.add_done_callback(lambda final_job: self.observe_result(final_job, options, audio_seconds))
+                final_job.add_done_callback(lambda final_job: self.relay_result(final_job, job))
+        except Exception as e:
+            for future in (job, refine_job):
+                if future is not None and not future.done():
+                    future.set_exception(e)
+
+    @staticmethod
+    def relay_result(source, target):
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+
+    def complete_transcription(self, job, transcription_future, timings, submit_time, refine_job=None,
+                               recording_name=None):
+        job_seconds = time.perf_counter() - submit_time
+        with self.pending_lock:
+            self.pending_transcriptions -= 1
+        try:
+            result = job.result()
+            transcription = result['text'] if isinstance(result, dict) else result
+        except Exception as e:
+            logging.error("Error during transcription: ", exc_info=e)
+            self.showing_partial = False
+            self.ui.change_state_indicator("red", text="Transcription Failed")
+            transcription_future.set_exception(e)
+            return
+
+        # Split the job time into waiting in the queue and decoding
+        decode_seconds = result.get('decode_seconds', job_seconds) if isinstance(result, dict) else job_seconds
+        timings.record("transcribe", decode_seconds)
+        timings.record("queue_wait", max(job_seconds - decode_seconds, 0.0))
 
         self.ui.change_state_indicator("green", text="Transcription Complete!")
 
-        self.is_recording = False
-        self.keystroke_thread.join()
-    
         self.ui.change_state_indicator("green", text="Complete!")
+        self.ui.change_state_indicator("grey", text="Ready")  # Use UI method
+        self.ui.flash_indicator()  # Use UI method
+        # The UI records ui_update and release_to_text once the text is on screen
+        self.showing_partial = False
+        self.ui.update_transcription_box(transcription, timings)
+
+        if recording_name is not None:
+            language = result.get('language') if isinstance(result, dict) else None
+            model = result.get('model') if isinstance(result, dict) else None
+            self.recording_history.update(recording_name, text=transcription, language=language,
+                                          model=model or self.model_name)
 
-        return result['text']
+        if refine_job is not None:
+            # The draft can be pasted now, the refined text replaces it if it is still untouched
+            draft = {"text": transcription, "pasted": False}
+            self.latest_draft = draft
+            refine_job.add_done_callback(lambda refine_job: self.complete_refinement(refine_job, draft, timings,
+                                                                                     recording_name))
 
+        transcription_future.set_result(transcription)
+
+    def complete_refinement(self, refine_job, draft, timings, recording_name=None):
+        try:
+            result = refine_job.result()
+        except Exception as e:
+            logging.error("Error refining transcription: ", exc_info=e)
+            return
+        timings.record("refine", result.get('decode_seconds', 0.0))
+        if recording_name is not None:
+            # The history keeps the refined text even if the draft was pasted
+            self.recording_history.update(recording_name, text=result['text'], language=result.get('language'),
+                                          model=result.get('model') or self.model_name)
+
+        if draft is not self.latest_draft or draft["pasted"]:
+            logging.info("Draft already pasted or replaced, keeping it.")
+            return
+        if self.ui.get_transcription_text().strip() != draft["text"].strip():
+            logging.info("Draft was edited, keeping the edit.")
+            return
+
+        logging.info("Replacing draft with refined text: %s", result['text'])
+        draft["text"] = result['text']
+        self.ui.update_transcription_box(result['text'])
+        if self.on_refined is not None:
+            self.on_refined(result['text'])
+
+    def show_partial(self, text):
+        self.showing_partial = True
+        self.ui.update_transcription_box(text)
+
+    def observe_result(self, job, options, audio_seconds, detect_language=True):
+        # Feeds the text and detected language to the decode context and decode speed to the model policy
+        if job.cancelled() or job.exception() is not None:
+            return
+        result = job.result()
+        if detect_language:
+            self.decode_settings.observe(options, result)
+        if self.model_policy is not None and not result.get('cached') and result.get('model'):
+            self.model_policy.observe(result['model'], audio_seconds, result['decode_seconds'])
+
+    def mark_pasted(self):
+        # Stops a pending refinement from replacing text the user already pasted
+        if self.latest_draft is not None:
+            self.latest_draft["pasted"] = True
 
     def toggle_recording(self):
         if not self.is_recording:
             self.ui.change_state_indicator("yellow", text="Recording Starting...")
-            # Start a new recording thread
-            self.recording_thread = threading.Thread(target=self.start_recording)
-            self.recording_thread.start()
+            # The stream is already open, this only flips the capture on
+            self.start_recording()
             return ""  # No transcription when starting
         else:
-            # Stop recording and wait for the thread to finish
-            self.is_recording = False
-            self.recording_thread.join()
-            transcription = self.stop_recording_and_transcribe()
-            self.ui.change_state_indicator("grey", text="Ready")  # Use UI method
-            self.ui.flash_indicator()  # Use UI method
-            self.ui.update_transcription_box(transcription)  # Use UI method to update the transcription box
-            return transcription  # Return the transcription text after stopping
+            # Returns a future, the transcription is queued and does not block the caller
+            return self.stop_recording_and_transcribe()
 
     def terminate(self):
+        self.transcription_service.shutdown()
+        self.recording_history.close()
+        self.streaming_executor.shutdown(wait=False, cancel_futures=True)
+        self.close_stream()
         self.audio.terminate()
 
-    def update_recordings_history(self, unique_file_name):
-        full_path = self.get_recording_file_path(unique_file_name)
-        if len(self.recordings_history) >= self.max_history_size:
-            oldest_recording = self.recordings_history.pop(0)
-            if os.path.exists(oldest_recording):
-                os.remove(oldest_recording)
-
-        self.recordings_history.append(full_path)
-    
-    def ensure_recordings_folder(self):
-        if not os.path.exists(self.recordings_folder):
-            os.makedirs(self.recordings_folder)
-    
-    def get_recording_file_path(self, file_name):
-        return os.path.join(self.recordings_folder, file_name)
-    
-    def get_unique_file_name(self):
-        timestamp = time.strftime("%Y%m%d-%H%M%S")
-        return f"recording_{timestamp}.wav"
-    
-    def update_model(self, new_model_name):
-        self.model_name = new_model_name
-        self.model = whisper.load_model(self.model_name)
-    
-    def load_model_from_config(self):
+    def create_voice_activity_detector(self):
+        if not self.vad_config.get('enabled', True):
+            return None
+        return VoiceActivityDetector(self.sample_rate,
+                                     backend=self.vad_config.get('backend', 'energy'),
+                                     padding=self.vad_config.get('padding', 0.2),
+                                     energy_ratio=self.vad_config.get('energy_ratio', 3.0),
+                                     min_energy=self.vad_config.get('min_energy', 200.0),
+                                     aggressiveness=self.vad_config.get('aggressiveness', 2))
+
+    def create_model_policy(self):
+        if not self.policy_config.get('enabled', False):
+            return None
+        candidates = self.policy_config.get('candidates') or [self.model_name]
+        policy = ModelSelectionPolicy(candidates,
+                                      latency_budget=self.policy_config.get('latency_budget', 2.0),
+                                      default_rtf=self.policy_config.get('default_rtf', 0.5),
+                                      smoothing=self.policy_config.get('smoothing', 0.3))
+        if self.policy_config.get('benchmark'):
+            policy.load_benchmark(self.policy_config['benchmark'], self.model_registry.backend_name)
+        return policy
+
+    def create_transcription_cache(self):
+        if not self.cache_config.get('enabled', True):
+            return None
+        try:
+            return TranscriptionCache(self.cache_config.get('path', "cache/transcriptions.sqlite3"),
+                                      self.cache_config.get('max_mb', 64))
+        except Exception as e:
+            logging.error(f"Error opening the transcription cache, continuing without it: {e}")
+            return None
+
+    def trim_silence(self, audio_samples):
+        speech_samples, self.last_vad_stats = self.voice_activity_detector.trim(audio_samples)
+        logging.info("VAD removed %.2fs of %.2fs (%.0f%%) before decoding.",
+                     self.last_vad_stats['removed_seconds'], self.last_vad_stats['original_seconds'],
+                     self.last_vad_stats['removed_ratio'] * 100)
+        return speech_samples
+
+    def transcribe_audio(self, audio_input, options):
+        # Streaming windows are never repeated, keep them out of the cache
+        return self.transcription_service.transcribe(audio_input, use_cache=False, **options)
+
+    def get_captured_audio(self, start_sample=0):
+        # What has been captured so far, from start_sample on
+        return pcm_to_float32(self.audio_buffer.view(start_sample))
+
+    @property
+    def model(self):
+        return self.model_registry.get_model()
+
+    @property
+    def model_name(self):
+        return self.model_registry.resolve_model_name()
+
+    def update_model(self, new_model_name, backend_name=None, backend_options=None):
+        self.transcription_service.update_model(new_model_name, backend_name, backend_options)
+
+    def preload_model(self, model_name, backend_name=None, backend_options=None, callback=None):
+        self.transcription_service.preload(model_name, backend_name, backend_options, callback)
+
+    def switch_model(self, model_name, backend_name=None, backend_options=None, callback=None):
+        # Non-blocking, recordings keep using the current model until the new one is ready
+        self.transcription_service.switch_model(model_name, backend_name, backend_options, callback)
+
+    def load_configuration(self):
         try:
             with open('config.json', 'r') as config_file:
                 config = json.load(config_file)
-                model_name = config.get('model', 'tiny')
-                self.model = whisper.load_model(model_name)
-        except Exception as e:
-            print(f"Error loading model from config: {e}")
-            self.model = whisper.load_model('tiny')
-
-    def simulate_keystrokes(self):
-        if self.ui.chat_mode.get():
-            # Press 'T' once to open the chat window
-            self.keyboard_controller.press(keyboard.KeyCode.from_char('t'))
-            self.keyboard_controller.release(keyboard.KeyCode.from_char('t'))
-            time.sleep(0.5)  # Short delay before starting the loop
-
-            # Cycle space and backspace while recording
-            while self.is_recording:
-                self.keyboard_controller.press(keyboard.Key.space)
-                self.keyboard_controller.release(keyboard.Key.space)
-                time.sleep(0.1)  # Short delay between space and backspace
-                self.keyboard_controller.press(keyboard.Key.backspace)
-                self.keyboard_controller.release(keyboard.Key.backspace)
-                time.sleep(0.9)  # Continue the loop every second
\ No newline at end of file
+                self.in_memory_transcription = config.get('in_memory_transcription', True)
+                self.streaming_transcription = config.get('streaming_transcription', False)
+                self.streaming_interval = config.get('streaming_interval', 1.0)
+                self.max_recording_seconds = config.get('max_recording_seconds', 300.0)
+                self.preroll_seconds = config.get('preroll_seconds', 0.5)
+                self.vad_config = config.get('vad', self.vad_config)
+                self.transcription_workers = config.get('transcription_workers', 0)
+                self.draft_model = config.get('draft_model', None)
+                self.cache_config = config.get('transcription_cache', self.cache_config)
+                self.history_config = config.get('recording_history', self.history_config)
+                self.policy_config = config.get('model_policy', self.policy_config)
+                self.cpu_tuning = config.get('cpu_tuning', None)
+                self.decode_settings.configure(config)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logging.error(f"Error loading recorder configuration: {e}")
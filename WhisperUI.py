@@ -1,9 +1,14 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import scrolledtext
+from tkinter import filedialog
 import json
+import queue
+import time
 from pynput import keyboard, mouse
 import logging
+from TranscriptionBackend import BACKENDS, COMPUTE_TYPES
+from DecodeSettings import DEFAULT_PROFILE, TASKS, TEMPERATURE_FALLBACK
 
 
 class WhisperUI:
@@ -15,7 +20,19 @@ class WhisperUI:
         self.icon = tk.PhotoImage(file='WEH.png')  # or .png
         self.root.iconphoto(True, self.icon)
 
-        self.show_loading_screen()
+        # Worker threads post UI updates here, the mainloop drains them
+        self.ui_events = queue.Queue()
+        self.ui_poll_interval = 30  # ms
+
+        # Plain copies of widget state, safe to read from worker threads
+        self.chat_mode_enabled = False
+        self.transcription_text = ""
+
+        # Decode profiles as last loaded from or saved to config.json
+        self.decode_profiles = {}
+
+        # Set by the controller, the recorder arrives once startup has finished in the background
+        self.controller = None
 
     def create_main_ui_window(self):
         #Create Tabs
@@ -28,6 +45,10 @@ class WhisperUI:
         logging.info("Create Config Tab...")
         self.create_config_ui()
 
+        # Stats tab
+        logging.info("Create Stats Tab...")
+        self.create_stats_ui()
+
         # Load saved/default config
         logging.info("Load config to UI....")
         self.load_configuration()
@@ -45,6 +66,14 @@ class WhisperUI:
         self.state_text = tk.Label(self.main_tab, text="Ready", font=("Helvetica", 12))
         self.state_text.pack()
 
+        # Startup progress while the model loads in the background, hidden once it is ready
+        self.loading_frame = tk.Frame(self.main_tab)
+        self.loading_label = tk.Label(self.loading_frame, text="", fg="grey")
+        self.loading_label.pack()
+        self.loading_progress = ttk.Progressbar(self.loading_frame, mode="indeterminate", length=200)
+        self.loading_progress.pack()
+        self.loading_visible = False
+
         # Admin mode toggle
         self.chat_mode = tk.BooleanVar()
         self.chat_mode_toggle = tk.Checkbutton(self.main_tab, text="Chat Mode", var=self.chat_mode, command=self.toggle_chat_mode)
@@ -57,6 +86,10 @@ class WhisperUI:
         # Transcription text box
         self.transcription_box = scrolledtext.ScrolledText(self.main_tab, wrap=tk.WORD)
         self.transcription_box.pack(pady=10, fill=tk.BOTH, expand=True)
+        self.transcription_box.bind("<<Modified>>", self.on_transcription_modified)
+
+        # Start draining queued UI updates
+        self.root.after(self.ui_poll_interval, self.process_ui_events)
 
     def create_main_window_tab_control(self):
 
@@ -66,35 +99,116 @@ class WhisperUI:
         # Create tabs
         self.main_tab = ttk.Frame(self.tabControl)
         self.config_tab = ttk.Frame(self.tabControl)
+        self.stats_tab = ttk.Frame(self.tabControl)
 
         logging.info("Constructing main page....")
         # Add tabs to the notebook
         self.tabControl.add(self.main_tab, text='Main')
         self.tabControl.add(self.config_tab, text='Config')
+        self.tabControl.add(self.stats_tab, text='Stats')
         self.tabControl.pack(expand=1, fill="both")
 
         # Create a label for the image
         self.icon_label = tk.Label(self.main_tab, image=self.icon)
         self.icon_label.pack()
 
-    # Updates the UI state indicator color (entire canvas)
+    # Updates the UI state indicator color (entire canvas), safe from any thread
     def change_state_indicator(self, color, text=""):
-        self.state_indicator.config(bg=color)
-        self.state_text.config(text=text)  # Update the text of the state label
-        self.root.update_idletasks()
+        self.ui_events.put(("state", (color, text)))
 
-    # Makes the indicator flash green
+    # Makes the indicator flash green, safe from any thread
     def flash_indicator(self):
-        self.change_state_indicator("green")
-        self.root.after(1000, lambda: self.change_state_indicator("grey", text="Ready"))
-
-    # Updates the transcription box
-    def update_transcription_box(self, text):
-        self.transcription_box.delete(1.0, tk.END)
-        self.transcription_box.insert(tk.INSERT, text)
-        self.transcription_box.update_idletasks()
+        self.ui_events.put(("flash", None))
+
+    # Updates the transcription box, safe from any thread.
+    # timings gets the ui_update span and the release_to_text mark once the text is drawn.
+    def update_transcription_box(self, text, timings=None):
+        self.transcription_text = text
+        self.ui_events.put(("transcription", (text, timings, time.perf_counter())))
+
+    # Shows startup progress, safe from any thread. done hides it, failed keeps the message up.
+    def set_loading_status(self, text, done=False, failed=False):
+        self.run_on_ui_thread(self.show_loading_status, text, done, failed)
+
+    def show_loading_status(self, text, done=False, failed=False):
+        if done:
+            self.loading_progress.stop()
+            self.loading_frame.pack_forget()
+            self.loading_visible = False
+            return
+        self.loading_label.config(text=text, fg="red" if failed else "grey")
+        if failed:
+            self.loading_progress.stop()
+        elif not self.loading_visible:
+            self.loading_progress.start(15)
+        if not self.loading_visible:
+            self.loading_frame.pack(after=self.state_text)
+            self.loading_visible = True
+
+    # Runs a callback on the Tk thread
+    def run_on_ui_thread(self, callback, *args):
+        self.ui_events.put(("call", (callback, args)))
+
+    def process_ui_events(self):
+        # Coalesce everything queued since the last poll into a single redraw
+        state = None
+        flash = False
+        transcription = None
+        # (timings, queued at) of the transcriptions drawn by this redraw
+        drawn = []
+        calls = []
+        while True:
+            try:
+                kind, payload = self.ui_events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "state":
+                state = payload
+                flash = False
+            elif kind == "flash":
+                state = ("green", "")
+                flash = True
+            elif kind == "transcription":
+                transcription, timings, queued_time = payload
+                if timings is not None:
+                    drawn.append((timings, queued_time))
+            elif kind == "call":
+                calls.append(payload)
+
+        if state is not None:
+            self.state_indicator.config(bg=state[0])
+            self.state_text.config(text=state[1])  # Update the text of the state label
+            if flash:
+                self.root.after(1000, lambda: self.change_state_indicator("grey", text="Ready"))
+        if transcription is not None:
+            self.transcription_box.delete(1.0, tk.END)
+            self.transcription_box.insert(tk.INSERT, transcription)
+            # Waiting for the poll plus the redraw, what the user actually waits for
+            self.transcription_box.update_idletasks()
+            for timings, queued_time in drawn:
+                timings.record("ui_update", time.perf_counter() - queued_time)
+                timings.mark_since_release("release_to_text")
+        for callback, args in calls:
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.error("Error running UI callback: ", exc_info=e)
+
+        self.root.after(self.ui_poll_interval, self.process_ui_events)
+
+    def on_transcription_modified(self, event=None):
+        # Keep a copy of user edits for the paste macro
+        self.transcription_text = self.transcription_box.get("1.0", "end-1c")
+        self.transcription_box.edit_modified(False)
+
+    def get_transcription_text(self):
+        return self.transcription_text
+
+    def is_chat_mode(self):
+        return self.chat_mode_enabled
 
     def toggle_chat_mode(self):
+        self.chat_mode_enabled = self.chat_mode.get()
         if self.chat_mode.get():
             print("Chat Mode ON")
         else:
@@ -127,10 +241,113 @@ class WhisperUI:
                                         values=["tiny", "base", "small", "medium", "large", "large-v2", "large-v3"])
         self.model_combobox.grid(row=3, column=1)
         self.model_combobox.current(0)  # Set default selection to 'tiny'
+        self.model_combobox.bind("<<ComboboxSelected>>", self.on_model_selected)
+
+        # Inference backend selection
+        tk.Label(self.config_tab, text="Backend:").grid(row=4, column=0, sticky='w')
+        self.backend_combobox = ttk.Combobox(self.config_tab, values=list(BACKENDS), state="readonly")
+        self.backend_combobox.grid(row=4, column=1)
+        self.backend_combobox.set("whisper")
+        self.backend_combobox.bind("<<ComboboxSelected>>", self.on_model_selected)
+
+        # Quantization and threads, used by faster-whisper
+        tk.Label(self.config_tab, text="Compute Type:").grid(row=5, column=0, sticky='w')
+        self.compute_type_combobox = ttk.Combobox(self.config_tab, values=COMPUTE_TYPES, state="readonly")
+        self.compute_type_combobox.grid(row=5, column=1)
+        self.compute_type_combobox.set("int8")
+        self.compute_type_combobox.bind("<<ComboboxSelected>>", self.on_model_selected)
+
+        tk.Label(self.config_tab, text="CPU Threads (0 = auto):").grid(row=6, column=0, sticky='w')
+        self.cpu_threads_spinbox = tk.Spinbox(self.config_tab, from_=0, to=256, width=5)
+        self.cpu_threads_spinbox.grid(row=6, column=1, sticky='w')
+
+        # Background model loading status
+        self.model_status_label = tk.Label(self.config_tab, text="", fg="grey")
+        self.model_status_label.grid(row=7, column=0, columnspan=3, sticky='w')
+
+        # Decode profile, pick an existing one or type a new name
+        tk.Label(self.config_tab, text="Decode Profile:").grid(row=8, column=0, sticky='w')
+        self.profile_combobox = ttk.Combobox(self.config_tab, values=["default"])
+        self.profile_combobox.grid(row=8, column=1)
+        self.profile_combobox.set("default")
+        self.profile_combobox.bind("<<ComboboxSelected>>", self.on_profile_selected)
+
+        tk.Label(self.config_tab, text="Task:").grid(row=9, column=0, sticky='w')
+        self.task_combobox = ttk.Combobox(self.config_tab, values=TASKS, state="readonly")
+        self.task_combobox.grid(row=9, column=1)
+
+        tk.Label(self.config_tab, text="Language (blank = detect):").grid(row=10, column=0, sticky='w')
+        self.language_entry = tk.Entry(self.config_tab)
+        self.language_entry.grid(row=10, column=1)
+
+        tk.Label(self.config_tab, text="Beam Size (0 = greedy):").grid(row=11, column=0, sticky='w')
+        self.beam_size_spinbox = tk.Spinbox(self.config_tab, from_=0, to=10, width=5)
+        self.beam_size_spinbox.grid(row=11, column=1, sticky='w')
+
+        self.temperature_fallback = tk.BooleanVar()
+        tk.Checkbutton(self.config_tab, text="Temperature fallback",
+                       var=self.temperature_fallback).grid(row=12, column=1, sticky='w')
+        self.condition_on_previous_text = tk.BooleanVar()
+        tk.Checkbutton(self.config_tab, text="Condition on previous text",
+                       var=self.condition_on_previous_text).grid(row=13, column=1, sticky='w')
+        self.sticky_language = tk.BooleanVar()
+        tk.Checkbutton(self.config_tab, text="Sticky language (reuse the detected language)",
+                       var=self.sticky_language).grid(row=14, column=1, sticky='w')
+        self.carry_context = tk.BooleanVar()
+        tk.Checkbutton(self.config_tab, text="Carry context (prompt with the previous sentence)",
+                       var=self.carry_context).grid(row=15, column=1, sticky='w')
+
+        tk.Label(self.config_tab, text="Vocabulary (comma separated):").grid(row=16, column=0, sticky='w')
+        self.vocabulary_entry = tk.Entry(self.config_tab)
+        self.vocabulary_entry.grid(row=16, column=1)
 
         # Save button
-        self.save_config_button = tk.Button(self.config_tab, text="Save and Close", command=self.save_configuration)
-        self.save_config_button.grid(row=4, column=1, sticky='e')
+        self.save_config_button = tk.Button(self.config_tab, text="Save", command=self.save_configuration)
+        self.save_config_button.grid(row=20, column=1, sticky='e')
+
+    def create_stats_ui(self):
+        # Latency per hot-path stage, in milliseconds
+        columns = ("last", "p50", "p95", "count")
+        self.stats_tree = ttk.Treeview(self.stats_tab, columns=columns, height=12)
+        self.stats_tree.heading("#0", text="Stage")
+        for column in columns:
+            self.stats_tree.heading(column, text=column if column == "count" else f"{column} (ms)")
+            self.stats_tree.column(column, width=80, anchor='e')
+        self.stats_tree.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        # Export buttons
+        stats_buttons = tk.Frame(self.stats_tab)
+        stats_buttons.pack(fill=tk.X)
+        tk.Button(stats_buttons, text="Refresh", command=self.refresh_stats).pack(side=tk.LEFT)
+        tk.Button(stats_buttons, text="Export JSONL", command=self.export_stats_jsonl).pack(side=tk.LEFT)
+        tk.Button(stats_buttons, text="Export Prometheus", command=self.export_stats_prometheus).pack(side=tk.LEFT)
+
+        self.schedule_stats_refresh()
+
+    def schedule_stats_refresh(self):
+        # Only redraw while the Stats tab is visible
+        if self.tabControl.select() == str(self.stats_tab):
+            self.refresh_stats()
+        self.root.after(2000, self.schedule_stats_refresh)
+
+    def refresh_stats(self):
+        if self.controller is None or self.controller.recorder is None:
+            return  # Still starting up
+        summary = self.controller.recorder.latency_metrics.summary()
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        for stage, stats in summary.items():
+            values = [f"{stats[column] * 1000:.1f}" for column in ("last", "p50", "p95")] + [stats["count"]]
+            self.stats_tree.insert("", tk.END, text=stage, values=values)
+
+    def export_stats_jsonl(self):
+        path = filedialog.asksaveasfilename(defaultextension=".jsonl", filetypes=[("JSON Lines", "*.jsonl")])
+        if path and self.controller.recorder is not None:
+            self.controller.recorder.latency_metrics.export_jsonl(path)
+
+    def export_stats_prometheus(self):
+        path = filedialog.asksaveasfilename(defaultextension=".prom", filetypes=[("Prometheus text", "*.prom")])
+        if path and self.controller.recorder is not None:
+            self.controller.recorder.latency_metrics.export_prometheus(path)
 
     def load_configuration(self):
         try:
@@ -153,33 +370,119 @@ class WhisperUI:
                 model_config = config.get('model', 'tiny')
                 self.model_combobox.set(model_config)
 
+                # Backend settings
+                self.backend_combobox.set(config.get('backend', 'whisper'))
+                self.compute_type_combobox.set(config.get('compute_type', 'int8'))
+                self.cpu_threads_spinbox.delete(0, tk.END)
+                self.cpu_threads_spinbox.insert(0, config.get('cpu_threads', 0))
+
+                # Decode profiles
+                self.decode_profiles = config.get('decode_profiles', {})
+                self.profile_combobox.config(values=list(self.decode_profiles) or ["default"])
+                self.profile_combobox.set(config.get('decode_profile', 'default'))
+                self.show_decode_profile(self.profile_combobox.get())
+                self.vocabulary_entry.delete(0, tk.END)
+                self.vocabulary_entry.insert(0, ", ".join(config.get('vocabulary', [])))
+
         except FileNotFoundError:
             print("Configuration file not found. Using default settings.")
         except json.JSONDecodeError:
             print("Error decoding configuration file. Using default settings.")
 
 
+    def read_configuration(self):
+        try:
+            with open('config.json', 'r') as config_file:
+                return json.load(config_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
     def save_configuration(self):
         # Extract only the type and key from the formatted string
         record_shortcut = self.record_shortcut_entry.get().split(": ")
         paste_shortcut = self.paste_shortcut_entry.get().split(": ")
-        self.controller.update_shortcuts_from_config()
 
         # Save the model selection
-        selected_model = self.model_combobox.get()
-
-        config = {
+        model_name, backend_name, backend_options = self.get_model_settings()
+
+        # Keep settings that are not edited on this tab
+        config = self.read_configuration()
+        profile_name = self.profile_combobox.get().strip() or "default"
+        decode_profiles = config.get('decode_profiles', {})
+        decode_profiles[profile_name] = self.get_decode_profile(decode_profiles.get(profile_name, {}))
+        self.decode_profiles = decode_profiles
+        self.profile_combobox.config(values=list(decode_profiles))
+        config.update({
             "record_shortcut": {"type": record_shortcut[0].lower(), "key": record_shortcut[1]},
             "paste_shortcut": {"type": paste_shortcut[0].lower(), "key": paste_shortcut[1]},
-            "model": selected_model
-        }
+            "model": model_name,
+            "backend": backend_name,
+            "compute_type": backend_options["compute_type"],
+            "cpu_threads": backend_options["cpu_threads"],
+            "decode_profile": profile_name,
+            "decode_profiles": decode_profiles,
+            "vocabulary": [word.strip() for word in self.vocabulary_entry.get().split(",") if word.strip()]
+        })
         with open('config.json', 'w') as config_file:
             json.dump(config, config_file)
         print("Configuration saved.")
 
-        # I need to reboot the app here to apply the config
-        self.close_application()
+        # Apply without restarting, the model is swapped in once it has loaded
+        self.controller.update_shortcuts_from_config()
+        if self.controller.recorder is not None:
+            # Otherwise the recorder reads the saved settings when it starts
+            self.controller.recorder.decode_settings.configure(config)
+            self.controller.switch_model(model_name, backend_name, backend_options)
+
+    def get_model_settings(self):
+        backend_options = {
+            "compute_type": self.compute_type_combobox.get(),
+            "cpu_threads": self.get_int_entry(self.cpu_threads_spinbox, 0),
+        }
+        return self.model_combobox.get(), self.backend_combobox.get(), backend_options
+
+    def show_decode_profile(self, profile_name):
+        profile = dict(DEFAULT_PROFILE)
+        profile.update(self.decode_profiles.get(profile_name, {}))
+        self.task_combobox.set(profile["task"])
+        self.language_entry.delete(0, tk.END)
+        self.language_entry.insert(0, profile["language"] or "")
+        self.beam_size_spinbox.delete(0, tk.END)
+        self.beam_size_spinbox.insert(0, profile["beam_size"] or 0)
+        self.temperature_fallback.set(isinstance(profile["temperature"], list))
+        self.condition_on_previous_text.set(profile["condition_on_previous_text"])
+        self.sticky_language.set(profile["sticky_language"])
+        self.carry_context.set(profile["carry_context"])
+
+    def get_decode_profile(self, saved_profile):
+        # A custom temperature list in config.json is kept while fallback stays on
+        temperature = saved_profile.get("temperature", TEMPERATURE_FALLBACK)
+        if not isinstance(temperature, list):
+            temperature = TEMPERATURE_FALLBACK
+        return {
+            "task": self.task_combobox.get(),
+            "language": self.language_entry.get().strip() or None,
+            "beam_size": self.get_int_entry(self.beam_size_spinbox, 0) or None,
+            "temperature": temperature if self.temperature_fallback.get() else 0.0,
+            "condition_on_previous_text": self.condition_on_previous_text.get(),
+            "sticky_language": self.sticky_language.get(),
+            "carry_context": self.carry_context.get(),
+        }
+
+    def on_profile_selected(self, event=None):
+        self.show_decode_profile(self.profile_combobox.get())
+
+    def on_model_selected(self, event=None):
+        self.controller.preload_model(*self.get_model_settings())
+
+    def set_model_status(self, text):
+        self.model_status_label.config(text=text)
 
+    def get_int_entry(self, entry, default):
+        try:
+            return int(entry.get())
+        except ValueError:
+            return default
 
     def detect_shortcut(self, mode):
         self.controller.shortcut_detection_mode = mode
@@ -204,33 +507,6 @@ class WhisperUI:
     def close_application(self):
         self.controller.close_application()
 
-    def show_loading_screen(self):
-        logging.info("Setup Loading screen....")
-        self.loading_window = tk.Toplevel(self.root)
-        self.loading_window.title("Loading")
-        self.loading_window.geometry("300x100")  # Example size, adjust as needed
-
-        # Create and add a label to the loading window
-        loading_label = tk.Label(self.loading_window, text="Loading WEHSPER model, please wait...")
-        loading_label.pack()
-
-        # Force the window and its contents to be updated
-        self.loading_window.update_idletasks()
-
-        # Make sure this window stays on top
-        self.loading_window.transient(self.root)
-        self.loading_window.grab_set()
-        self.loading_window.focus_set()
-        self.loading_window.lift()
-        self.loading_window.update()
-        logging.info("Loading Screen Set.")
-
-
-    def close_loading_screen(self):
-        # Ensure that this is run on the main thread
-        if self.loading_window:
-            self.root.after(0, self.loading_window.destroy)
-
     def set_controller(self, controller):
         self.controller = controller
 
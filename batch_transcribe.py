@@ -0,0 +1,138 @@
+import argparse
+import concurrent.futures
+import logging
+import json
+import sys
+import os
+
+from ModelRegistry import ModelRegistry
+from TranscriptionService import TranscriptionService
+from TranscriptionCache import TranscriptionCache
+
+AUDIO_EXTENSIONS = ('.wav', '.pcm', '.raw', '.flac', '.mp3', '.ogg', '.opus', '.m4a', '.webm', '.mp4', '.mkv')
+
+
+def find_audio_files(paths):
+    # Files are taken as given, directories are searched recursively
+    audio_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, file_names in os.walk(path):
+                audio_files.extend(os.path.join(directory, name) for name in sorted(file_names)
+                                   if name.lower().endswith(AUDIO_EXTENSIONS))
+        elif os.path.isfile(path):
+            audio_files.append(path)
+        else:
+            logging.error(f"No such file or directory: {path}")
+    return audio_files
+
+
+def transcribe_files(audio_files, model_name=None, backend_name=None, backend_options=None, workers=1,
+                     use_cache=True, chunking=(30.0, 2.0), config_path='config.json', **options):
+    # Library entry point: yields one result dict per file, in the order they finish.
+    # WAV/PCM files are memory-mapped and decoded in overlapping windows, chunking=None turns that off.
+    registry = ModelRegistry(config_path)
+    registry.configure(model_name, backend_name, backend_options)
+
+    cache = None
+    if use_cache:
+        cache_config = read_cache_config(config_path)
+        if cache_config.get('enabled', True):
+            cache = TranscriptionCache(cache_config.get('path', "cache/transcriptions.sqlite3"),
+                                       cache_config.get('max_mb', 64))
+
+    service = TranscriptionService(registry, workers, cache=cache)
+    try:
+        jobs = {service.submit(audio_file, chunking=chunking, **options): audio_file for audio_file in audio_files}
+        for job in concurrent.futures.as_completed(jobs):
+            audio_file = jobs[job]
+            try:
+                result = job.result()
+            except Exception as e:
+                logging.error(f"Error transcribing {audio_file}: {e}")
+                yield {"file": audio_file, "error": str(e)}
+                continue
+            yield {
+                "file": audio_file,
+                "model": registry.model_name,
+                "backend": registry.backend_name,
+                "language": result.get("language"),
+                "text": result["text"].strip(),
+                "segments": result["segments"],
+                "decode_seconds": result.get("decode_seconds"),
+                "cached": result.get("cached", False),
+            }
+    finally:
+        service.shutdown()
+
+
+def read_cache_config(config_path):
+    try:
+        with open(config_path, 'r') as config_file:
+            return json.load(config_file).get('transcription_cache', {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe many audio files with Wehspr, one JSON line per file.")
+    parser.add_argument('paths', nargs='+', help="Audio files or directories (searched recursively)")
+    parser.add_argument('--model', default=None, help="Model to use (default: the configured model)")
+    parser.add_argument('--backend', default=None, help="Backend to use (default: the configured backend)")
+    parser.add_argument('--compute-type', default=None, help="faster-whisper compute type")
+    parser.add_argument('--cpu-threads', type=int, default=None, help="faster-whisper CPU threads per worker")
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help="faster-whisper batched decoding of each file's segments (default: 1, off)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes, each with its own copy of the model (0: in this process)")
+    parser.add_argument('--task', default='transcribe', choices=['translate', 'transcribe'])
+    parser.add_argument('--language', default=None, help="Skip language detection, e.g. 'en'")
+    parser.add_argument('--no-cache', action='store_true', help="Do not read or write the transcription cache")
+    parser.add_argument('--window', type=float, default=30.0, help="Seconds per window for WAV/PCM files")
+    parser.add_argument('--overlap', type=float, default=2.0, help="Seconds of overlap between windows")
+    parser.add_argument('--no-chunking', action='store_true',
+                        help="Let the model load WAV/PCM files whole instead of memory-mapping them in windows")
+    parser.add_argument('--output', default=None, help="Write JSON lines here instead of stdout")
+    args = parser.parse_args()
+    if not args.no_chunking and not 0 <= args.overlap < args.window:
+        parser.error("--overlap must be at least 0 and shorter than --window")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+
+    audio_files = find_audio_files(args.paths)
+    if not audio_files:
+        logging.error("No audio files found.")
+        sys.exit(1)
+    logging.info("Transcribing %d file(s) with %d worker(s)...", len(audio_files), args.workers)
+
+    # Backend options fall back to config.json
+    registry = ModelRegistry()
+    registry.resolve_model_name()
+    backend_options = dict(registry.backend_options)
+    if args.compute_type is not None:
+        backend_options['compute_type'] = args.compute_type
+    if args.cpu_threads is not None:
+        backend_options['cpu_threads'] = args.cpu_threads
+    if args.batch_size > 1:
+        backend_options['batch_size'] = args.batch_size
+
+    options = {"task": args.task}
+    if args.language:
+        options["language"] = args.language
+
+    output_file = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for result in transcribe_files(audio_files, args.model, args.backend, backend_options, args.workers,
+                                       use_cache=not args.no_cache,
+                                       chunking=None if args.no_chunking else (args.window, args.overlap),
+                                       **options):
+            # Stream each result as soon as it is ready
+            output_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output_file.flush()
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import argparse
+import concurrent.futures
+import multiprocessing
+import platform
+import logging
+import json
+import time
+import sys
+import os
+import re
+import numpy as np
+
+from ModelRegistry import ModelRegistry
+from TranscriptionService import run_transcription
+from AudioFileReader import AudioFileReader
+from RecordingHistory import AUDIO_EXTENSIONS
+from CpuTuning import apply_cpu_tuning
+
+SAMPLE_RATE = 16000
+
+
+def load_wav_file(path):
+    # Any PCM WAV -> float32 mono at 16 kHz, FLAC/Opus history files need soundfile
+    if not AudioFileReader.supports(path):
+        import soundfile
+        audio, sample_rate = soundfile.read(path, dtype='float32', always_2d=True)
+        if sample_rate != SAMPLE_RATE:
+            raise ValueError(f"{path} is {sample_rate} Hz, expected {SAMPLE_RATE} Hz")
+        return audio.mean(axis=1)
+    with AudioFileReader(path) as reader:
+        return reader.read_all()
+
+
+def normalize_words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    # Word level Levenshtein distance divided by the reference length
+    reference_words = normalize_words(reference)
+    hypothesis_words = normalize_words(hypothesis)
+    if not reference_words:
+        return 0.0 if not hypothesis_words else 1.0
+
+    previous = list(range(len(hypothesis_words) + 1))
+    for i, reference_word in enumerate(reference_words, 1):
+        current = [i]
+        for j, hypothesis_word in enumerate(hypothesis_words, 1):
+            current.append(min(previous[j] + 1,
+                                current[j - 1] + 1,
+                                previous[j - 1] + (reference_word != hypothesis_word)))
+        previous = current
+    return previous[-1] / len(reference_words)
+
+
+def percentile(values, percent):
+    if not values:
+        return None
+    return float(np.percentile(values, percent))
+
+
+def get_peak_memory():
+    # Peak RSS of this process in bytes, None if it cannot be measured
+    try:
+        import psutil
+        memory_info = psutil.Process(os.getpid()).memory_info()
+        if hasattr(memory_info, 'peak_wset'):
+            return memory_info.peak_wset
+    except ImportError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return None
+
+
+def find_audio_files(audio_dir):
+    return sorted(os.path.join(audio_dir, name) for name in os.listdir(audio_dir)
+                  if name.lower().endswith(AUDIO_EXTENSIONS))
+
+
+def read_reference(audio_path):
+    # Reference transcript next to the clip, e.g. recording_x.wav -> recording_x.txt
+    reference_path = os.path.splitext(audio_path)[0] + '.txt'
+    if not os.path.exists(reference_path):
+        return None
+    with open(reference_path, 'r', encoding='utf-8') as reference_file:
+        return reference_file.read().strip()
+
+
+def benchmark_model(backend_name, model_name, backend_options, audio_files, options, runs, cpu_tuning=None):
+    # Runs in its own process, so load time and peak memory belong to this model only
+    apply_cpu_tuning(cpu_tuning)
+    registry = ModelRegistry()
+    load_start = time.perf_counter()
+    model = registry.update_model(model_name, backend_name, backend_options)
+    load_time = time.perf_counter() - load_start
+
+    latencies = []
+    real_time_factors = []
+    error_rates = []
+    clips = []
+    for audio_path in audio_files:
+        audio = load_wav_file(audio_path)
+        duration = len(audio) / SAMPLE_RATE
+        if duration == 0:
+            continue
+
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            result = run_transcription(model, audio, dict(options))
+            latency = time.perf_counter() - start_time
+            latencies.append(latency)
+            real_time_factors.append(latency / duration)
+
+        clip = {"file": audio_path, "duration": duration, "latency": latency,
+                "real_time_factor": latency / duration, "text": result["text"].strip()}
+        reference = read_reference(audio_path)
+        if reference is not None:
+            clip["word_error_rate"] = word_error_rate(reference, result["text"])
+            error_rates.append(clip["word_error_rate"])
+        clips.append(clip)
+
+    return {
+        "backend": backend_name,
+        "model": model_name,
+        "backend_options": backend_options,
+        "cpu_tuning": cpu_tuning,
+        "load_time": load_time,
+        "clips": len(clips),
+        "real_time_factor": float(np.mean(real_time_factors)) if real_time_factors else None,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "peak_rss": get_peak_memory(),
+        "word_error_rate": float(np.mean(error_rates)) if error_rates else None,
+        "details": clips,
+    }
+
+
+def run_benchmark(backends, models, backend_options, audio_files, options, runs, cpu_tunings=(None,)):
+    # One fresh process per backend, model and CPU setting, thread counts cannot change once torch has run
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for backend_name in backends:
+        for model_name in models:
+            for cpu_tuning in cpu_tunings:
+                model_options = dict(backend_options)
+                if backend_name == "faster-whisper" and cpu_tuning and cpu_tuning.get("intra_op_threads"):
+                    # CTranslate2 does not use torch's threads, its own count is cpu_threads
+                    model_options["cpu_threads"] = cpu_tuning["intra_op_threads"]
+                logging.info("Benchmarking %s / %s with %s on %d clip(s)...", backend_name, model_name,
+                             cpu_tuning or "default CPU settings", len(audio_files))
+                with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    future = executor.submit(benchmark_model, backend_name, model_name, model_options,
+                                             audio_files, options, runs, cpu_tuning)
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        logging.error(f"Benchmark of {backend_name} / {model_name} failed: {e}")
+                        results.append({"backend": backend_name, "model": model_name, "cpu_tuning": cpu_tuning,
+                                        "error": str(e)})
+    return results
+
+
+def parse_cpu_tunings(thread_configs, priority, affinity, base_tuning):
+    # "4x1" -> 4 intra-op and 1 inter-op thread, "4" leaves inter-op threads alone
+    base_tuning = dict(base_tuning or {})
+    if priority:
+        base_tuning["priority"] = priority
+    if affinity:
+        base_tuning["affinity"] = parse_cores(affinity)
+    if not thread_configs:
+        return [base_tuning or None]
+    cpu_tunings = []
+    for thread_config in thread_configs:
+        intra, _, inter = thread_config.partition('x')
+        cpu_tuning = dict(base_tuning, intra_op_threads=int(intra))
+        if inter:
+            cpu_tuning["inter_op_threads"] = int(inter)
+        cpu_tunings.append(cpu_tuning)
+    return cpu_tunings
+
+
+def parse_cores(affinity):
+    # "0-3,6" -> [0, 1, 2, 3, 6]
+    cores = []
+    for part in affinity.split(','):
+        first, _, last = part.partition('-')
+        cores.extend(range(int(first), int(last or first) + 1))
+    return cores
+
+
+def read_cpu_tuning(config_path='config.json'):
+    try:
+        with open(config_path, 'r') as config_file:
+            return json.load(config_file).get('cpu_tuning')
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Wehspr transcription models on recorded clips.")
+    parser.add_argument('--audio-dir', default='recordings', help="Directory of clips (default: recordings)")
+    parser.add_argument('--models', nargs='+', default=None, help="Models to run (default: the configured model)")
+    parser.add_argument('--backends', nargs='+', default=None, help="Backends to run (default: the configured backend)")
+    parser.add_argument('--compute-type', default=None, help="faster-whisper compute type")
+    parser.add_argument('--cpu-threads', type=int, default=None, help="faster-whisper CPU threads")
+    parser.add_argument('--thread-configs', nargs='+', default=None,
+                        help="CPU thread settings to compare, intra-op x inter-op, e.g. 2x1 4x1 8x2")
+    parser.add_argument('--priority', default=None, help="Inference priority, e.g. below_normal")
+    parser.add_argument('--affinity', default=None, help="Cores to pin inference to, e.g. 0-3")
+    parser.add_argument('--task', default='translate', choices=['translate', 'transcribe'])
+    parser.add_argument('--runs', type=int, default=1, help="Transcriptions per clip")
+    parser.add_argument('--output', default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Defaults come from config.json
+    registry = ModelRegistry()
+    # Reads the backend and its options from config.json too, also when --models is given
+    configured_model = registry.resolve_model_name()
+    models = args.models or [configured_model]
+    backends = args.backends or [registry.backend_name]
+    backend_options = dict(registry.backend_options)
+    if args.compute_type is not None:
+        backend_options['compute_type'] = args.compute_type
+    if args.cpu_threads is not None:
+        backend_options['cpu_threads'] = args.cpu_threads
+
+    cpu_tunings = parse_cpu_tunings(args.thread_configs, args.priority, args.affinity, read_cpu_tuning())
+
+    audio_files = find_audio_files(args.audio_dir)
+    if not audio_files:
+        logging.error(f"No audio files found in {args.audio_dir}")
+        sys.exit(1)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"platform": platform.platform(), "processor": platform.processor(), "cpu_count": os.cpu_count()},
+        "audio_dir": args.audio_dir,
+        "task": args.task,
+        "runs": args.runs,
+        "results": run_benchmark(backends, models, backend_options, audio_files, {"task": args.task}, args.runs,
+                                 cpu_tunings),
+    }
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+        logging.info("Benchmark report written to %s", args.output)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
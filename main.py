@@ -8,7 +8,9 @@ def main():
 
     logging.info("Setup UI.")
     whisper_ui = WhisperUI()
+    whisper_ui.create_main_ui_window()
     
+    # Audio and the model load in the background, see WhisperController.load_recorder
     logging.info("Setup Controller.")
     whisper_controller = WhisperController(whisper_ui)
     whisper_ui.set_controller(whisper_controller)
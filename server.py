@@ -0,0 +1,62 @@
+import argparse
+import logging
+import json
+
+from ModelRegistry import ModelRegistry
+from TranscriptionService import TranscriptionService
+from TranscriptionServer import TranscriptionServer
+from DecodeSettings import DecodeSettings
+
+
+def read_configuration(config_path):
+    try:
+        with open(config_path, 'r') as config_file:
+            return json.load(config_file)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logging.error(f"Error loading configuration: {e}")
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Wehspr transcription over a local HTTP API, without the UI.")
+    parser.add_argument('--host', default=None, help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=None, help="Port to listen on (default: 8765)")
+    parser.add_argument('--model', default=None, help="Model to use (default: the configured model)")
+    parser.add_argument('--backend', default=None, help="Backend to use (default: the configured backend)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes, each with its own copy of the model (default: transcription_workers)")
+    parser.add_argument('--config', default='config.json', help="Configuration file (default: config.json)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    config = read_configuration(args.config)
+    server_config = config.get('server', {})
+    workers = args.workers if args.workers is not None else config.get('transcription_workers', 0)
+
+    # Load the model before accepting requests, it stays resident for every client
+    registry = ModelRegistry(args.config)
+    registry.configure(args.model, args.backend)
+    service = TranscriptionService(registry, workers, cpu_tuning=config.get('cpu_tuning'))
+    service.warm_up()
+
+    decode_settings = DecodeSettings()
+    decode_settings.configure(config)
+
+    server = TranscriptionServer(service, decode_settings,
+                                 host=args.host or server_config.get('host', "127.0.0.1"),
+                                 port=args.port or server_config.get('port', 8765),
+                                 max_sessions_per_client=server_config.get('max_sessions_per_client', 2),
+                                 max_requests_per_client=server_config.get('max_requests_per_client', 2),
+                                 session_timeout=server_config.get('session_timeout', 300.0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Shutting down...")
+    finally:
+        server.shutdown()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()